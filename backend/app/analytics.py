@@ -0,0 +1,136 @@
+"""In-memory columnar store of check-ins for traffic analytics.
+
+Every check-in (hot and archived) is held as three parallel NumPy columns:
+UTC timestamp in seconds (int64), member id (int32) and a membership-type
+code (int8), about 13 bytes per check-in. The store is loaded from the
+database on first use, appended to on each committed check-in, and answers
+GET /analytics/traffic with vectorized masks and bincounts instead of
+GROUP BY queries over attendances joined to members.
+"""
+import calendar
+import threading
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models, utils
+
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday (Monday == 0)
+DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def to_epoch_seconds(dt: datetime) -> int:
+    # Naive timestamps come from CURRENT_TIMESTAMP and are UTC
+    if dt.tzinfo is None:
+        return calendar.timegm(dt.timetuple())
+    return int(dt.timestamp())
+
+
+class AttendanceColumns:
+    def __init__(self, initial_capacity: int = 1024):
+        self._lock = threading.Lock()
+        self._size = 0
+        self._timestamps = np.empty(initial_capacity, dtype=np.int64)
+        self._member_ids = np.empty(initial_capacity, dtype=np.int32)
+        self._type_codes = np.empty(initial_capacity, dtype=np.int8)
+        self.type_codes = {}
+        self.loaded = False
+        self._max_loaded_id = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self._timestamps.nbytes + self._member_ids.nbytes + self._type_codes.nbytes
+
+    def _type_code(self, membership_type: Optional[str]) -> int:
+        if membership_type not in self.type_codes:
+            self.type_codes[membership_type] = len(self.type_codes)
+        return self.type_codes[membership_type]
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        if needed <= len(self._timestamps):
+            return
+        capacity = max(needed, 2 * len(self._timestamps))
+        self._timestamps = np.resize(self._timestamps, capacity)
+        self._member_ids = np.resize(self._member_ids, capacity)
+        self._type_codes = np.resize(self._type_codes, capacity)
+
+    def load(self, db: Session):
+        """Read every check-in once. Safe to call concurrently with append()."""
+        with self._lock:
+            if self.loaded:
+                return
+            rows = []
+            for model in (models.Attendance, models.AttendanceArchive):
+                rows.extend(
+                    db.query(model.id, model.check_in_time, model.member_id, models.Member.membership_type)
+                    .outerjoin(models.Member, models.Member.id == model.member_id)
+                    .all()
+                )
+            self._reserve(len(rows))
+            for i, (_, check_in_time, member_id, membership_type) in enumerate(rows):
+                self._timestamps[i] = to_epoch_seconds(check_in_time)
+                self._member_ids[i] = member_id or 0
+                self._type_codes[i] = self._type_code(membership_type)
+            self._size = len(rows)
+            self._max_loaded_id = max((row[0] for row in rows), default=0)
+            self.loaded = True
+
+    def append(self, attendance_id: int, check_in_time: datetime, member_id: int, membership_type: Optional[str]):
+        with self._lock:
+            # Before load() there is nothing to append to, and rows load() already read are skipped
+            if not self.loaded or attendance_id <= self._max_loaded_id:
+                return
+            self._reserve(1)
+            self._timestamps[self._size] = to_epoch_seconds(check_in_time)
+            self._member_ids[self._size] = member_id or 0
+            self._type_codes[self._size] = self._type_code(membership_type)
+            self._size += 1
+
+    def traffic(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        membership_type: Optional[str] = None,
+    ) -> dict:
+        with self._lock:
+            size = self._size
+            timestamps = self._timestamps[:size]
+            type_codes = self._type_codes[:size]
+            names = {code: name for name, code in self.type_codes.items()}
+            mask = np.ones(size, dtype=bool)
+            if since is not None:
+                mask &= timestamps >= to_epoch_seconds(since)
+            if until is not None:
+                mask &= timestamps < to_epoch_seconds(until)
+            if membership_type is not None:
+                code = self.type_codes.get(membership_type)
+                mask &= type_codes == (code if code is not None else -1)
+            timestamps = timestamps[mask]
+            type_codes = type_codes[mask]
+
+        # Gym-local time; Asia/Kathmandu has a fixed offset
+        offset = int(utils.get_current_nepal_time().utcoffset().total_seconds())
+        local = timestamps + offset
+        hour = (local // 3600) % 24
+        weekday = (local // 86400 + EPOCH_WEEKDAY) % 7
+
+        hour_of_week = np.bincount(weekday * 24 + hour, minlength=7 * 24).reshape(7, 24)
+        by_hour = hour_of_week.sum(axis=0)
+        by_type = np.bincount(type_codes, minlength=len(names))
+
+        return {
+            "total": int(timestamps.size),
+            "days": DAY_NAMES,
+            "hour_of_week": hour_of_week.tolist(),
+            "by_hour": by_hour.tolist(),
+            "peak_hour": int(by_hour.argmax()) if timestamps.size else None,
+            "by_membership_type": {
+                names[code]: int(count) for code, count in enumerate(by_type) if count and names[code] is not None
+            },
+        }
@@ -0,0 +1,98 @@
+"""Hot/cold partitioning of attendance history.
+
+`attendances` only keeps the last `attendance_hot_days` days, so the kiosk and
+dashboard queries and their indexes stay small. Older rows are moved to
+`attendances_archive` in bounded batches by a periodic job, and history
+queries read the archive only when the requested range reaches past the hot
+window.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+
+ARCHIVE_COLUMNS = ["id", "member_id", "check_in_time", "check_out_time"]
+
+
+def hot_cutoff(hot_days: int) -> datetime:
+    # check_in_time defaults to CURRENT_TIMESTAMP, i.e. naive UTC on SQLite
+    return datetime.utcnow() - timedelta(days=hot_days)
+
+
+def _naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    # Stored timestamps are naive UTC; aware input (e.g. "...Z") is converted to match
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def archive_attendance(session_factory, hot_days: int, batch_size: int = 500) -> int:
+    """Move check-ins older than `hot_days` into the archive, one batch per transaction.
+
+    Returns the number of rows moved.
+    """
+    cutoff = hot_cutoff(hot_days)
+    moved = 0
+    while True:
+        db = session_factory()
+        try:
+            ids = db.execute(
+                select(models.Attendance.id)
+                .where(models.Attendance.check_in_time < cutoff)
+                .order_by(models.Attendance.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+
+            columns = [getattr(models.Attendance, name) for name in ARCHIVE_COLUMNS]
+            db.execute(
+                insert(models.AttendanceArchive).from_select(
+                    ARCHIVE_COLUMNS, select(*columns).where(models.Attendance.id.in_(ids))
+                )
+            )
+            db.execute(delete(models.Attendance).where(models.Attendance.id.in_(ids)))
+            db.commit()
+            moved += len(ids)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    if moved:
+        print(f"Archived {moved} attendance records older than {cutoff}")
+    return moved
+
+
+def attendance_history(
+    db: Session,
+    member_id: int,
+    hot_days: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """A member's check-ins, newest first, across the hot table and the archive.
+
+    Archived rows are all older than the hot window, so the archive is only
+    queried when `since` is unset or falls before it.
+    """
+    since, until = _naive_utc(since), _naive_utc(until)
+    sources = [models.Attendance]
+    if since is None or since < hot_cutoff(hot_days):
+        sources.append(models.AttendanceArchive)
+
+    records = []
+    for model in sources:
+        query = db.query(model).options(joinedload(model.member)).filter(model.member_id == member_id)
+        if since is not None:
+            query = query.filter(model.check_in_time >= since)
+        if until is not None:
+            query = query.filter(model.check_in_time < until)
+        records.extend(query.all())
+
+    records.sort(key=lambda attendance: attendance.check_in_time, reverse=True)
+    return records
@@ -0,0 +1,111 @@
+"""Live check-in feed for dashboards.
+
+Committed check-ins are published to every connected GET /attendance/stream
+client as Server-Sent Events. Live events reach a stream out of id order
+(concurrent requests, other workers' check-ins arriving a poll later), so
+they are never filtered by id; a reconnecting client only skips what its
+replay already sent.
+
+Clients that poll use GET /attendance/changes with the cursor from their
+previous call and receive only newer rows. The cursor is the attendance id.
+That is only safe on SQLite, which commits one writer at a time and so
+hands ids out in commit order (attendances is AUTOINCREMENT, so deleted ids
+are never reused); on Postgres a lower sequence value can commit after a
+higher one was read, and a poller would skip it for good. Rows a poller already holds can still be
+checked out, so it also passes `open_from`, the id of its oldest row still
+open, and gets the check-out times of rows from there up to its cursor.
+Auto-checkout closes every session within MAX_SESSION_MINUTES, which bounds
+that range.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+
+from . import models, schemas
+
+
+class _Subscriber:
+    def __init__(self, max_queue: int):
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+
+class AttendanceFeed:
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def publish(self, attendance: schemas.AttendanceOut):
+        """Thread-safe; called from request threads after the check-in is committed."""
+        if self._loop is None or not self._subscribers:
+            return
+        self._loop.call_soon_threadsafe(self._fan_out, attendance.id, attendance.json())
+
+    def _fan_out(self, event_id: int, payload: str):
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait((event_id, payload))
+            except asyncio.QueueFull:
+                # Too slow to keep up; it reconnects with Last-Event-ID and replays
+                subscriber.overflowed = True
+                self._subscribers.discard(subscriber)
+
+    @asynccontextmanager
+    async def subscribe(self):
+        subscriber = _Subscriber(self.max_queue)
+        self._subscribers.add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            self._subscribers.discard(subscriber)
+
+
+def _with_member(query):
+    return query.options(joinedload(models.Attendance.member))
+
+
+def attendance_snapshot(db: Session):
+    """Today's check-ins plus the cursor to pass as `since` next time."""
+    cursor = db.query(func.max(models.Attendance.id)).scalar() or 0
+    today = datetime.now().date()
+    rows = _with_member(db.query(models.Attendance)).filter(
+        models.Attendance.id <= cursor,
+        func.date(models.Attendance.check_in_time) == today
+    ).order_by(models.Attendance.id).all()
+    return {"cursor": cursor, "changes": rows, "has_more": False}
+
+
+def attendance_changes(db: Session, since: int, limit: int, open_from: Optional[int] = None):
+    """Check-ins with an id greater than `since`, oldest first, at most `limit` of them.
+
+    With `open_from`, also the check-outs of rows in [open_from, since].
+    """
+    rows = _with_member(db.query(models.Attendance)).filter(
+        models.Attendance.id > since
+    ).order_by(models.Attendance.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    cursor = rows[-1].id if rows else since
+    check_outs = []
+    if open_from is not None:
+        check_outs = [
+            {"id": id, "check_out_time": check_out_time}
+            for id, check_out_time in db.query(models.Attendance.id, models.Attendance.check_out_time).filter(
+                models.Attendance.id >= open_from,
+                models.Attendance.id <= since,
+                models.Attendance.check_out_time.isnot(None),
+            ).all()
+        ]
+    return {"cursor": cursor, "changes": rows, "has_more": has_more, "check_outs": check_outs}
+
+
+def format_event(event_id: int, payload: str) -> str:
+    return f"id: {event_id}\nevent: check-in\ndata: {payload}\n\n"
@@ -4,19 +4,12 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from . import models, schemas
 from sqlalchemy.orm import Session
-import os
-from dotenv import load_dotenv
+from .config import settings
 
-# Load environment variables
-load_dotenv()
-
-# Get configuration from environment variables
-SECRET_KEY = os.getenv("JWT_SECRET_KEY")
-ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-
-if not SECRET_KEY:
-    raise ValueError("JWT_SECRET_KEY must be set in environment variables")
+# Configuration comes from the central settings object (see config.py)
+SECRET_KEY = settings.jwt_secret_key
+ALGORITHM = settings.jwt_algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
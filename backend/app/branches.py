@@ -0,0 +1,123 @@
+"""Gym branches, each with its own database.
+
+Every branch owns a primary and read engine plus the in-memory state that is
+derived from its check-ins (occupancy, live feed, analytics stores and the
+optional group-commit writer), so branches share nothing on the request path
+and adding one adds capacity. The default branch uses the engines from
+database.py and also stores the admin accounts.
+
+With several workers, each worker applies the other workers' writes to its
+own copy of that state through the branch's invalidation bus.
+
+Requests pick their branch from an explicit `branch` query parameter, the
+`branch` claim of the admin's token, or the member code prefix, in that
+order; otherwise the default branch is used.
+"""
+from typing import Dict, Optional
+
+from sqlalchemy.orm import joinedload
+
+from . import database, models, schemas
+from .analytics import AttendanceColumns
+from .attendance_feed import AttendanceFeed
+from .attendance_writer import AttendanceWriter
+from .config import BranchSettings, settings
+from .dashboard import SingleFlightCache, dashboard_summary
+from .invalidation import InvalidationBus
+from .member_activity import AttendanceBitmaps
+from .occupancy import OccupancyCounter
+
+
+class Branch:
+    def __init__(self, key: str, config: BranchSettings, engine=None, read_engine=None):
+        self.key = key
+        self.member_code_prefix = config.member_code_prefix
+        if engine is None:
+            engine, read_engine = database.create_engines(config.database_url, config.read_database_url)
+        self.engine = engine
+        self.read_engine = read_engine
+        self.SessionLocal = database.create_session_factory(engine)
+        self.ReadSessionLocal = database.create_session_factory(read_engine)
+
+        self.bus = InvalidationBus(
+            engine,
+            self.SessionLocal,
+            enabled=settings.cache_invalidation_enabled,
+            retention_seconds=settings.invalidation_retention_seconds,
+        )
+        self.occupancy = OccupancyCounter()
+        self.feed = AttendanceFeed()
+        self.columns = AttendanceColumns()
+        self.bitmaps = AttendanceBitmaps()
+        self.attendance_writer = AttendanceWriter(
+            self.SessionLocal,
+            max_batch_size=settings.attendance_batch_max_size,
+            max_wait_ms=settings.attendance_batch_max_wait_ms,
+            bus=self.bus,
+        ) if settings.attendance_group_commit else None
+        self.dashboard = SingleFlightCache(self._dashboard_summary, settings.dashboard_cache_seconds)
+        self.bus.subscribe("attendance", self._on_attendance_changes)
+        # Check-ins only age the dashboard by its TTL; member changes show at once
+        self.bus.subscribe("member", lambda changes: self.dashboard.invalidate())
+
+    def member_code(self, number: int) -> str:
+        return f"{self.member_code_prefix}{str(number).zfill(3)}"
+
+    def _dashboard_summary(self):
+        db = self.ReadSessionLocal()
+        try:
+            return dashboard_summary(db, settings.dashboard_recent_limit)
+        finally:
+            db.close()
+
+    def _apply_check_in(self, event: schemas.AttendanceOut, membership_type: Optional[str]):
+        self.feed.publish(event)
+        self.columns.append(event.id, event.check_in_time, event.member_id, membership_type)
+        self.bitmaps.mark(event.id, event.member_id, event.check_in_time)
+
+    def record_check_in(self, attendance, member):
+        """Called once a check-in is committed here, whichever path wrote it."""
+        self.occupancy.checked_in()
+        self._apply_check_in(
+            schemas.AttendanceOut.validate(attendance),
+            member.membership_type if member is not None else None,
+        )
+
+    def _on_attendance_changes(self, changes):
+        # Another worker checked members in or out: recount, and replay its check-ins
+        created = [attendance_id for action, attendance_id in changes if action == "created"]
+        db = self.SessionLocal()
+        try:
+            self.occupancy.rebuild(db)
+            rows = db.query(models.Attendance).options(joinedload(models.Attendance.member)).filter(
+                models.Attendance.id.in_(created)
+            ).order_by(models.Attendance.id).all() if created else []
+            for attendance in rows:
+                self._apply_check_in(
+                    schemas.AttendanceOut.validate(attendance),
+                    attendance.member.membership_type if attendance.member is not None else None,
+                )
+        finally:
+            db.close()
+
+
+def _build_branches() -> Dict[str, Branch]:
+    built = {}
+    for key, config in settings.all_branches.items():
+        if key == settings.default_branch:
+            built[key] = Branch(key, config, database.engine, database.read_engine)
+        else:
+            built[key] = Branch(key, config)
+    return built
+
+
+branches = _build_branches()
+default_branch = branches[settings.default_branch]
+
+
+def branch_for_member_code(member_code: Optional[str]) -> Optional[Branch]:
+    """The branch whose prefix starts `member_code` (longest prefix wins)."""
+    if not member_code:
+        return None
+    matches = [branch for branch in branches.values() if member_code.startswith(branch.member_code_prefix)]
+    return max(matches, key=lambda branch: len(branch.member_code_prefix)) if matches else None
@@ -0,0 +1,123 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, BaseSettings, Field, validator
+
+# backend/.env, independent of the working directory uvicorn is started from
+ENV_FILE = Path(__file__).resolve().parent.parent / ".env"
+
+
+class BranchSettings(BaseModel):
+    database_url: str
+    read_database_url: Optional[str] = None
+    member_code_prefix: str
+
+
+class Settings(BaseSettings):
+    # Database. The shared .env carries a hosted DATABASE_URL that this service
+    # does not use, so the local SQLite file is configured under its own name.
+    database_url: str = Field("sqlite:///./gym_management.db", env="GYM_DATABASE_URL")
+
+    # Optional read replica; without it SQLite reads use read-only connections
+    # to the same file. Clients that just wrote read from the primary for
+    # READ_YOUR_WRITES_SECONDS.
+    read_database_url: Optional[str] = Field(None, env="READ_DATABASE_URL")
+    read_your_writes_seconds: float = Field(5, env="READ_YOUR_WRITES_SECONDS")
+
+    # Branches. The database above is the default branch and also holds the
+    # admin accounts; further branches each get their own database, e.g.
+    # GYM_BRANCHES={"north": {"database_url": "sqlite:///./gym_north.db", "member_code_prefix": "TDFN"}}
+    default_branch: str = Field("main", env="DEFAULT_BRANCH")
+    member_code_prefix: str = Field("TDFC", env="MEMBER_CODE_PREFIX")
+    branches: Dict[str, BranchSettings] = Field({}, env="GYM_BRANCHES")
+
+    # Auth
+    jwt_secret_key: str = Field(None, env="JWT_SECRET_KEY")
+    jwt_algorithm: str = Field("HS256", env="JWT_ALGORITHM")
+    access_token_expire_minutes: int = Field(30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+
+    # HTTP
+    cors_origins: str = Field("http://localhost:8501", env="CORS_ORIGINS")
+
+    # Startup. On hosts where migrations run in the build/release step, turn
+    # RUN_MIGRATIONS_ON_STARTUP off so alembic is never imported on a cold start.
+    run_migrations_on_startup: bool = Field(True, env="RUN_MIGRATIONS_ON_STARTUP")
+    warmup_on_startup: bool = Field(True, env="WARMUP_ON_STARTUP")
+
+    # Attendance group commit (see attendance_writer.py)
+    attendance_group_commit: bool = Field(False, env="ATTENDANCE_GROUP_COMMIT")
+    attendance_batch_max_size: int = Field(64, env="ATTENDANCE_BATCH_MAX_SIZE")
+    attendance_batch_max_wait_ms: float = Field(5.0, env="ATTENDANCE_BATCH_MAX_WAIT_MS")
+
+    # Attendance archival (see archive.py)
+    attendance_hot_days: int = Field(90, env="ATTENDANCE_HOT_DAYS")
+    attendance_archive_batch_size: int = Field(500, env="ATTENDANCE_ARCHIVE_BATCH_SIZE")
+    attendance_archive_interval_seconds: float = Field(3600, env="ATTENDANCE_ARCHIVE_INTERVAL_SECONDS")
+
+    # Occupancy (see occupancy.py)
+    max_session_minutes: int = Field(240, env="MAX_SESSION_MINUTES")
+    auto_checkout_interval_seconds: float = Field(300, env="AUTO_CHECKOUT_INTERVAL_SECONDS")
+
+    # Purge of soft-deleted members (see member_purge.py)
+    member_purge_grace_days: int = Field(30, env="MEMBER_PURGE_GRACE_DAYS")
+    member_purge_batch_size: int = Field(500, env="MEMBER_PURGE_BATCH_SIZE")
+    member_purge_interval_seconds: float = Field(3600, env="MEMBER_PURGE_INTERVAL_SECONDS")
+
+    # Admin dashboard summary (see dashboard.py)
+    dashboard_cache_seconds: float = Field(5, env="DASHBOARD_CACHE_SECONDS")
+    dashboard_recent_limit: int = Field(10, env="DASHBOARD_RECENT_LIMIT")
+
+    # Cross-worker cache invalidation (see invalidation.py). Every worker
+    # applies other workers' changes within INVALIDATION_POLL_SECONDS.
+    cache_invalidation_enabled: bool = Field(True, env="CACHE_INVALIDATION_ENABLED")
+    invalidation_poll_seconds: float = Field(0.5, env="INVALIDATION_POLL_SECONDS", gt=0)
+    invalidation_retention_seconds: float = Field(3600, env="INVALIDATION_RETENTION_SECONDS")
+
+    # Request profiling (see profiling.py). When off the middleware is not
+    # installed at all. Admins can profile one request with X-Profile-Request.
+    profiling_enabled: bool = Field(False, env="PROFILING_ENABLED")
+    profiling_sample_rate: float = Field(0.0, env="PROFILING_SAMPLE_RATE", ge=0, le=1)
+    profiling_interval_ms: float = Field(5.0, env="PROFILING_INTERVAL_MS", gt=0)
+    profiling_dir: str = Field("profiles", env="PROFILING_DIR")
+    profiling_max_profiles: int = Field(100, env="PROFILING_MAX_PROFILES", ge=1)
+
+    class Config:
+        env_file = ENV_FILE
+        env_file_encoding = "utf-8"
+
+    @validator("jwt_secret_key", always=True)
+    def secret_key_required(cls, value):
+        if not value:
+            raise ValueError("JWT_SECRET_KEY must be set in environment variables")
+        return value
+
+    @validator("branches")
+    def branches_distinct(cls, value, values):
+        if values.get("default_branch") in value:
+            raise ValueError("GYM_BRANCHES must not redefine the default branch")
+        prefixes = [branch.member_code_prefix for branch in value.values()] + [values.get("member_code_prefix")]
+        if len(set(prefixes)) != len(prefixes):
+            raise ValueError("Each branch needs its own member_code_prefix")
+        return value
+
+    @property
+    def all_branches(self) -> Dict[str, BranchSettings]:
+        default = BranchSettings(
+            database_url=self.database_url,
+            read_database_url=self.read_database_url,
+            member_code_prefix=self.member_code_prefix,
+        )
+        return {self.default_branch: default, **self.branches}
+
+    @property
+    def cors_origin_list(self) -> List[str]:
+        return self.cors_origins.split(",")
+
+
+@lru_cache()
+def get_settings() -> Settings:
+    return Settings()
+
+
+settings = get_settings()
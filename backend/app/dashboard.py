@@ -0,0 +1,86 @@
+"""Admin dashboard summary, computed in SQL and cached with single flight.
+
+GET /dashboard/summary returns member counts (one COUNT ... GROUP BY
+membership_status), today's check-in count and the latest check-ins. The
+result is cached per branch for DASHBOARD_CACHE_SECONDS, and concurrent
+requests that miss the cache wait for one computation instead of each
+running their own, so N open dashboards cost one set of queries.
+"""
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+
+from . import models, schemas
+
+
+class SingleFlightCache:
+    """One value cached for `ttl_seconds`; concurrent misses share a single `compute()`."""
+
+    def __init__(self, compute: Callable[[], object], ttl_seconds: float):
+        self.compute = compute
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires = 0.0
+        self._generation = 0
+        self._inflight: Optional[Future] = None
+
+    def get(self):
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expires:
+                return self._value
+            future = self._inflight
+            leader = future is None
+            if leader:
+                future = self._inflight = Future()
+                generation = self._generation
+        if not leader:
+            return future.result()
+
+        try:
+            value = self.compute()
+        except Exception as e:
+            with self._lock:
+                self._inflight = None
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight = None
+            # An invalidate() during the computation means this value may already be stale
+            if generation == self._generation:
+                self._value = value
+                self._expires = time.monotonic() + self.ttl
+        future.set_result(value)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._generation += 1
+
+
+def dashboard_summary(db: Session, recent_limit: int = 10) -> schemas.DashboardSummary:
+    counts = dict(db.query(models.Member.membership_status, func.count(models.Member.id)).filter(
+        models.Member.is_deleted == False
+    ).group_by(models.Member.membership_status).all())
+    today = func.date(models.Attendance.check_in_time) == datetime.now().date()
+    today_check_ins = db.query(func.count(models.Attendance.id)).filter(today).scalar()
+    recent = db.query(models.Attendance).options(joinedload(models.Attendance.member)).filter(
+        today
+    ).order_by(models.Attendance.id.desc()).limit(recent_limit).all()
+
+    total = sum(counts.values())
+    active = counts.get(True, 0)
+    return schemas.DashboardSummary(
+        total_members=total,
+        active_members=active,
+        inactive_members=total - active,
+        today_check_ins=today_check_ins,
+        recent_check_ins=[schemas.AttendanceOut.from_orm(attendance) for attendance in recent],
+        generated_at=datetime.utcnow(),
+    )
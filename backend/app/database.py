@@ -1,29 +1,94 @@
-from sqlalchemy import create_engine, text
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from .config import settings
+
+# Use SQLite database (the default branch, see branches.py)
+DATABASE_URL = settings.database_url
+
+def _sqlite_read_only_url(url: str):
+    url = make_url(url)
+    if not url.database or url.database == ":memory:":
+        return None
+    return url.set(database=f"file:{url.database}", query={"mode": "ro", "uri": "true"})
+
+def create_engines(database_url: str, read_database_url: str = None):
+    """Primary and read engine for one database.
+
+    The read engine is a replica when `read_database_url` is given, read-only
+    connections to the same file on SQLite (WAL lets them read while the
+    primary writes), and the primary itself otherwise.
+    """
+    is_sqlite = database_url.startswith("sqlite")
+    primary = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False} if is_sqlite else {},
+    )
+    if read_database_url:
+        return primary, create_engine(read_database_url)
+    if is_sqlite and _sqlite_read_only_url(database_url) is not None:
+        @event.listens_for(primary, "connect")
+        def _enable_wal(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+        return primary, create_engine(
+            _sqlite_read_only_url(database_url),
+            connect_args={"check_same_thread": False},
+        )
+    return primary, primary
+
+def create_session_factory(bind):
+    # Session factory with relationship loading support
+    return sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=bind,
+        class_=Session  # This enables relationship loading features
+    )
 
-# Use SQLite database
-DATABASE_URL = "sqlite:///./gym_management.db"
+def insert_unless_conflict(db: Session, model):
+    """INSERT ... ON CONFLICT DO NOTHING for the session's database (SQLite 3.35+ or Postgres).
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    Add `.returning(model)` and execute with `db.scalars(...).first()`: None
+    means a unique constraint or unique index already held the values.
+    """
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(model).on_conflict_do_nothing()
 
-# Create a session factory with relationship loading support
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine,
-    class_=Session  # This enables relationship loading features
-)
+# Engines of the default branch; sessions come from branches.Branch
+engine, read_engine = create_engines(DATABASE_URL, settings.read_database_url)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+class ReadYourWrites:
+    """Remembers which clients wrote recently so their reads can go to the primary.
+
+    A replica may lag behind the primary; a client pinned here sees its own
+    writes for `window_seconds` after its last mutating request.
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._pins = {}
+        self._lock = threading.Lock()
+
+    def pin(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            self._pins[key] = now + self.window_seconds
+            if len(self._pins) > 10000:
+                self._pins = {k: expiry for k, expiry in self._pins.items() if expiry > now}
+
+    def is_pinned(self, key: str) -> bool:
+        expiry = self._pins.get(key)
+        return expiry is not None and expiry > time.monotonic()
+
+
+read_your_writes = ReadYourWrites(settings.read_your_writes_seconds)
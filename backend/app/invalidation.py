@@ -0,0 +1,146 @@
+"""Cross-worker cache invalidation through the database.
+
+Each worker process keeps in-memory state per branch (occupancy, the live
+feed, analytics stores and caches). With several uvicorn/gunicorn workers a
+write handled by one worker must reach the others, without adding an
+external service.
+
+Write paths call `publish()` with the session they are writing through, so
+an entity-level change notice ("attendance created 42") lands in the
+`change_log` table in the same transaction as the change itself. Every
+worker polls the table every INVALIDATION_POLL_SECONDS and hands the notices
+written by *other* workers to the handlers subscribed to that entity, so a
+change is applied everywhere within one poll interval. On SQLite the poll
+first checks `PRAGMA data_version` on a dedicated connection, which only
+changes when another connection commits, so an idle database costs no
+query. Notices older than INVALIDATION_RETENTION_SECONDS are pruned; ids
+are AUTOINCREMENT so they never restart, and a poller that finds the
+newest id below its cursor anyway (a table created before that) starts
+over from the beginning.
+"""
+import os
+import socket
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert
+
+from . import models
+
+# Identifies this process in change_log.origin so it skips its own notices
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+Change = Tuple[str, Optional[int]]
+
+
+class InvalidationBus:
+    def __init__(self, engine, session_factory, enabled: bool = True, retention_seconds: float = 3600,
+                 batch_size: int = 1000, origin: str = WORKER_ID):
+        self.engine = engine
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.retention = timedelta(seconds=retention_seconds)
+        self.batch_size = batch_size
+        self.origin = origin
+        self._handlers = defaultdict(list)
+        self._cursor = 0
+        self._watch = None
+        self._data_version = None
+
+    def subscribe(self, entity: str, handler: Callable[[List[Change]], object]):
+        """`handler` receives [(action, entity_id), ...] for changes made by other workers."""
+        self._handlers[entity].append(handler)
+
+    def publish(self, db, entity: str, action: str, entity_id: Optional[int] = None):
+        """Record a change in `db`'s transaction; it is only seen once the caller commits."""
+        if self.enabled:
+            db.add(models.ChangeLog(entity=entity, action=action, entity_id=entity_id, origin=self.origin))
+
+    def publish_many(self, db, entity: str, action: str, entity_ids: Iterable[int]):
+        if self.enabled:
+            rows = [
+                {"entity": entity, "action": action, "entity_id": entity_id, "origin": self.origin}
+                for entity_id in entity_ids
+            ]
+            if rows:
+                db.execute(insert(models.ChangeLog), rows)
+
+    def start(self):
+        """Skip notices written before this worker started; its state was just loaded."""
+        if not self.enabled:
+            return
+        db = self.session_factory()
+        try:
+            self._cursor = db.query(func.max(models.ChangeLog.id)).scalar() or 0
+        finally:
+            db.close()
+        if self.engine.dialect.name == "sqlite":
+            self._watch = self.engine.raw_connection()
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.close()
+            self._watch = None
+
+    def _changed(self) -> bool:
+        if self._watch is None:
+            return True
+        data_version = self._watch.execute("PRAGMA data_version").fetchone()[0]
+        changed = data_version != self._data_version
+        self._data_version = data_version
+        return changed
+
+    def poll(self) -> int:
+        """Apply other workers' changes since the last poll. Returns how many were applied."""
+        if not self.enabled or not self._changed():
+            return 0
+        applied = 0
+        db = self.session_factory()
+        try:
+            newest_id = db.query(func.max(models.ChangeLog.id)).scalar() or 0
+        finally:
+            db.close()
+        if newest_id < self._cursor:
+            self._cursor = 0
+        while True:
+            db = self.session_factory()
+            try:
+                rows = db.query(
+                    models.ChangeLog.id, models.ChangeLog.entity, models.ChangeLog.action,
+                    models.ChangeLog.entity_id, models.ChangeLog.origin,
+                ).filter(models.ChangeLog.id > self._cursor).order_by(models.ChangeLog.id).limit(self.batch_size).all()
+            finally:
+                db.close()
+            if not rows:
+                return applied
+            self._cursor = rows[-1].id
+
+            changes = defaultdict(list)
+            for row in rows:
+                if row.origin != self.origin:
+                    changes[row.entity].append((row.action, row.entity_id))
+            for entity, entity_changes in changes.items():
+                for handler in self._handlers.get(entity, ()):
+                    try:
+                        handler(entity_changes)
+                    except Exception as e:
+                        print(f"Invalidation handler for {entity} failed: {str(e)}")
+                applied += len(entity_changes)
+            if len(rows) < self.batch_size:
+                return applied
+
+    def prune(self) -> int:
+        db = self.session_factory()
+        try:
+            result = db.execute(delete(models.ChangeLog).where(
+                models.ChangeLog.created_at < datetime.utcnow() - self.retention
+            ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return result.rowcount
@@ -1,52 +1,213 @@
+from .startup import FirstRequestTimer, profiler, run_migrations, warm_up
+
+import asyncio
+import hmac
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import List
+from functools import partial
+from typing import List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from jose import JWTError
-from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import joinedload
-from dotenv import load_dotenv
-import os
 
 from app import models, schemas, database, auth, utils
-from .database import engine, Base
+from .archive import archive_attendance, attendance_history
+from .attendance_feed import attendance_changes, attendance_snapshot, format_event
+from .attendance_writer import DuplicateCheckIn
+from .branches import Branch, branch_for_member_code, branches, default_branch
+from .config import settings
+from .member_bulk import bulk_update_members
+from .member_purge import purge_deleted_members
+from .member_snapshot import build_snapshot, next_version, phone_hash
+from .occupancy import auto_checkout
+from .profiling import ProfileStore, RequestProfiler
+from .tasks import PeriodicTasks
+
+profiler.mark("imports")
+
+def _branch_jobs(tasks: PeriodicTasks, branch: Branch):
+    tasks.add(
+        f"attendance-archive:{branch.key}",
+        settings.attendance_archive_interval_seconds,
+        partial(
+            archive_attendance,
+            branch.SessionLocal,
+            settings.attendance_hot_days,
+            settings.attendance_archive_batch_size,
+        ),
+    )
+    tasks.add(
+        f"auto-checkout:{branch.key}",
+        settings.auto_checkout_interval_seconds,
+        partial(auto_checkout, branch.SessionLocal, settings.max_session_minutes, branch.occupancy, branch.bus),
+    )
+    if branch.bus.enabled:
+        tasks.add(f"invalidation-poll:{branch.key}", settings.invalidation_poll_seconds, branch.bus.poll)
+        tasks.add(f"invalidation-prune:{branch.key}", settings.invalidation_retention_seconds, branch.bus.prune)
+    tasks.add(
+        f"member-purge:{branch.key}",
+        settings.member_purge_interval_seconds,
+        partial(
+            purge_deleted_members,
+            branch.SessionLocal,
+            settings.member_purge_grace_days,
+            settings.member_purge_batch_size,
+        ),
+    )
 
-# Load environment variables
-load_dotenv()
+background_tasks = PeriodicTasks()
+for key in branches:
+    _branch_jobs(background_tasks, branches[key])
 
-# Create tables if they don't exist
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema is managed by alembic migrations (backend/migrations), per branch database
+    if settings.run_migrations_on_startup:
+        with profiler.phase("migrations"):
+            for branch in branches.values():
+                run_migrations(branch.engine)
+    if settings.warmup_on_startup:
+        with profiler.phase("warmup"):
+            for branch in branches.values():
+                warm_up(branch.engine, branch.SessionLocal, branch.read_engine)
+    with profiler.phase("occupancy"):
+        for branch in branches.values():
+            auto_checkout(branch.SessionLocal, settings.max_session_minutes, branch.occupancy, branch.bus)
+            db = branch.SessionLocal()
+            try:
+                branch.occupancy.rebuild(db)
+            finally:
+                db.close()
+    loop = asyncio.get_running_loop()
+    for branch in branches.values():
+        # Other workers' writes are applied from here on
+        branch.bus.start()
+        # Optional write-behind path for check-ins
+        if branch.attendance_writer is not None:
+            branch.attendance_writer.start()
+        branch.feed.bind(loop)
+    background_tasks.start()
+    profiler.ready()
+    print(f"Startup report: {profiler.report()}")
+    yield
+    await background_tasks.stop()
+    for branch in branches.values():
+        if branch.attendance_writer is not None:
+            branch.attendance_writer.stop()
+        branch.bus.stop()
 
 app = FastAPI(
     title="Gym Management System API",
     description="API for managing gym members, attendance, and payments",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# CORS middleware with configuration from environment
+app.add_middleware(FirstRequestTimer)
+
+def _is_admin_token(token: str) -> bool:
+    try:
+        return auth.jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]).get("sub") is not None
+    except JWTError:
+        return False
+
+# Opt-in request profiling; with PROFILING_ENABLED off the middleware is not installed
+profile_store = ProfileStore(settings.profiling_dir, settings.profiling_max_profiles)
+if settings.profiling_enabled:
+    app.add_middleware(
+        RequestProfiler,
+        store=profile_store,
+        sample_rate=settings.profiling_sample_rate,
+        interval_ms=settings.profiling_interval_ms,
+        is_admin=_is_admin_token,
+    )
+
+# CORS middleware with configuration from settings
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=os.getenv("CORS_ORIGINS", "http://localhost:8501").split(","),
+    allow_origins=settings.cors_origin_list,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Dependency
-def get_db():
-    db = database.get_db()
+# Only authenticated clients are pinned: anonymous kiosks share the proxy's IP,
+# and keying on it would pin every anonymous reader during the check-in rush
+def _client_key(request: Request) -> Optional[str]:
+    return request.headers.get("authorization")
+
+def _token_branch(request: Request) -> Optional[str]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return auth.jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]).get("branch")
+    except JWTError:
+        return None
+
+# Dependency: the branch a request is for. An explicit ?branch= wins, then the
+# admin token's branch claim, then the prefix of the member code involved.
+def get_branch(request: Request, branch: Optional[str] = Query(None)) -> Branch:
+    key = branch or _token_branch(request)
+    if key is None:
+        member_code = request.path_params.get("member_code") or request.query_params.get("member_code")
+        return branch_for_member_code(member_code) or default_branch
+    if key not in branches:
+        raise HTTPException(status_code=404, detail="Unknown branch")
+    return branches[key]
+
+# Primary (write) session. Mutating requests pin their client to the primary
+# for a short window so its next reads see what it just wrote.
+def _primary_session(request: Request, branch: Branch):
+    client_key = _client_key(request)
+    pin = client_key is not None and request.method not in ("GET", "HEAD", "OPTIONS")
+    if pin:
+        database.read_your_writes.pin(client_key)
+    db = branch.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        if pin:
+            database.read_your_writes.pin(client_key)
+
+# Read-only session, routed to the primary while the client is pinned
+def _read_session(request: Request, branch: Branch):
+    client_key = _client_key(request)
+    if client_key is not None and database.read_your_writes.is_pinned(client_key):
+        db = branch.SessionLocal()
+    else:
+        db = branch.ReadSessionLocal()
     try:
-        yield next(db)
+        yield db
     finally:
-        next(db, None)
+        db.close()
+
+# Dependencies
+def get_db(request: Request, branch: Branch = Depends(get_branch)):
+    yield from _primary_session(request, branch)
+
+def get_read_db(request: Request, branch: Branch = Depends(get_branch)):
+    yield from _read_session(request, branch)
+
+# Admin accounts live in the default branch's database
+def get_admin_db(request: Request):
+    yield from _primary_session(request, default_branch)
+
+def get_admin_read_db(request: Request):
+    yield from _read_session(request, default_branch)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # Dependency to get current admin
-async def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = Depends(get_admin_read_db)):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
@@ -61,6 +222,9 @@ async def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = D
     except JWTError:
         raise credentials_exception
     admin = db.query(models.Admin).filter(models.Admin.username == token_data.username).first()
+    # Give the connection back now rather than when the request ends, so
+    # requests waiting on shared work (e.g. the dashboard) don't drain the pool
+    db.close()
     if admin is None:
         raise credentials_exception
     return admin
@@ -69,16 +233,12 @@ async def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = D
 def health_check():
     return {"status": "ok"}
 
+@app.get("/health/startup")
+def startup_report():
+    return profiler.report()
+
 @app.post("/members/", response_model=schemas.Member)
-def create_member(member: schemas.MemberCreate, db: Session = Depends(get_db), current_admin: models.Admin = Depends(get_current_admin)):
-    # Check if phone number already exists
-    if db.query(models.Member).filter(models.Member.phone == member.phone).first():
-        raise HTTPException(status_code=400, detail="Phone number already registered")
-    
-    # Check if member code already exists (if provided)
-    if member.member_code and db.query(models.Member).filter(models.Member.member_code == member.member_code).first():
-        raise HTTPException(status_code=400, detail="Member code already exists")
-    
+def create_member(member: schemas.MemberCreate, db: Session = Depends(get_db), branch: Branch = Depends(get_branch), current_admin: models.Admin = Depends(get_current_admin)):
     # Create member data
     member_data = member.dict()
     
@@ -86,38 +246,67 @@ def create_member(member: schemas.MemberCreate, db: Session = Depends(get_db), c
     if not member_data.get('member_code'):
         latest_member = db.query(models.Member).order_by(models.Member.id.desc()).first()
         next_id = 1 if not latest_member else latest_member.id + 1
-        member_data['member_code'] = f'TDFC{str(next_id).zfill(3)}'
+        member_data['member_code'] = branch.member_code(next_id)
     
     # Ensure membership_status is set
     member_data['membership_status'] = True
+    member_data['version'] = next_version(db)
     
+    # Insert first; the live-member unique indexes on phone and member_code decide duplicates
     try:
-        db_member = models.Member(**member_data)
-        db.add(db_member)
-        db.commit()
-        db.refresh(db_member)
-        return db_member
+        db_member = db.scalars(
+            database.insert_unless_conflict(db, models.Member).values(**member_data).returning(models.Member)
+        ).first()
+        if db_member is not None:
+            branch.bus.publish(db, "member", "created", db_member.id)
+            db.commit()
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    
+    if db_member is None:
+        db.rollback()
+        # Only the conflict path pays for finding out which value was taken
+        if db.query(models.Member.id).filter(models.Member.phone == member.phone, models.Member.is_deleted == False).first():
+            raise HTTPException(status_code=400, detail="Phone number already registered")
+        raise HTTPException(status_code=400, detail="Member code already exists")
+    branch.dashboard.invalidate()
+    db.refresh(db_member)
+    return db_member
 
 @app.get("/members/", response_model=List[schemas.Member])
-def get_members(db: Session = Depends(get_db), current_admin: models.Admin = Depends(get_current_admin)):
+def get_members(db: Session = Depends(get_read_db), current_admin: models.Admin = Depends(get_current_admin)):
     return db.query(models.Member).filter(models.Member.is_deleted == False).all()
 
+# Activate, deactivate, change type or soft delete many members in one transaction
+@app.post("/members/bulk-update", response_model=schemas.MemberBulkResult)
+def bulk_update(request: schemas.MemberBulkUpdate, db: Session = Depends(get_db), branch: Branch = Depends(get_branch), current_admin: models.Admin = Depends(get_current_admin)):
+    result = bulk_update_members(db, request, branch.bus)
+    if result["updated"]:
+        branch.dashboard.invalidate()
+    return result
+
 # Public endpoints for member attendance
+# Kiosks that verified a member from their snapshot send the snapshot's
+# phone_hash (hex) instead of the phone number
 @app.post("/attendance/mark", response_model=schemas.AttendanceOut)
-def mark_member_attendance(member_code: str, phone: str, db: Session = Depends(get_db)):
+def mark_member_attendance(member_code: str, phone: Optional[str] = None, phone_hash_hex: Optional[str] = Query(None, alias="phone_hash"), db: Session = Depends(get_db), branch: Branch = Depends(get_branch)):
     print("Processing attendance request...")
     print(f"Member code: {member_code}, Phone: {phone}")
+    if phone is None and phone_hash_hex is None:
+        raise HTTPException(status_code=400, detail="Phone or phone_hash is required")
     
     # First verify the member exists and is active
     member = db.query(models.Member).filter(
         models.Member.member_code == member_code,
-        models.Member.phone == phone
+        models.Member.is_deleted == False
     ).first()
     
-    if not member:
+    if phone is not None:
+        matches = member is not None and member.phone == phone
+    else:
+        matches = member is not None and hmac.compare_digest(phone_hash(member.phone).hex(), phone_hash_hex.lower())
+    if not matches:
         raise HTTPException(status_code=404, detail="Member not found")
     
     if not member.membership_status:
@@ -133,47 +322,113 @@ def mark_member_attendance(member_code: str, phone: str, db: Session = Depends(g
     if existing_attendance:
         raise HTTPException(status_code=400, detail="Attendance already marked for today")
     
+    # Group commit: hand the insert to the writer and wait for its batch to commit.
+    # The request session is closed first so waiting requests don't hold pooled
+    # connections the writer needs; member stays usable as a detached object.
+    if branch.attendance_writer is not None:
+        db.close()
+        try:
+            attendance = branch.attendance_writer.submit(member.id)
+        except DuplicateCheckIn:
+            raise HTTPException(status_code=400, detail="Attendance already marked for today")
+        attendance["member"] = member
+        branch.record_check_in(attendance, member)
+        return attendance
+    
     # Create new attendance record
     attendance = models.Attendance(member_id=member.id)
     db.add(attendance)
+    db.flush()
+    branch.bus.publish(db, "attendance", "created", attendance.id)
     db.commit()
     db.refresh(attendance)
+    branch.record_check_in(attendance, member)
+    
+    return attendance
+
+@app.post("/attendance/checkout", response_model=schemas.AttendanceOut)
+def checkout_member(member_code: str, phone: str, db: Session = Depends(get_db), branch: Branch = Depends(get_branch)):
+    member = db.query(models.Member).filter(
+        models.Member.member_code == member_code,
+        models.Member.phone == phone,
+        models.Member.is_deleted == False
+    ).first()
+    
+    if not member:
+        raise HTTPException(status_code=404, detail="Member not found")
     
+    attendance = db.query(models.Attendance).filter(
+        models.Attendance.member_id == member.id,
+        models.Attendance.check_out_time.is_(None)
+    ).order_by(models.Attendance.check_in_time.desc()).first()
+    
+    if not attendance:
+        raise HTTPException(status_code=404, detail="No open check-in found")
+    
+    # Conditional update so concurrent check-outs only count once
+    result = db.execute(
+        update(models.Attendance)
+        .where(models.Attendance.id == attendance.id, models.Attendance.check_out_time.is_(None))
+        .values(check_out_time=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        branch.bus.publish(db, "attendance", "updated", attendance.id)
+    db.commit()
+    if result.rowcount == 0:
+        raise HTTPException(status_code=400, detail="Already checked out")
+    branch.occupancy.checked_out()
+    
+    db.refresh(attendance)
     return attendance
 
+@app.get("/occupancy", response_model=schemas.Occupancy)
+def get_occupancy(branch: Branch = Depends(get_branch)):
+    return {"occupancy": branch.occupancy.count}
+
+@app.get("/members/snapshot")
+def get_member_snapshot(since: Optional[int] = Query(None, ge=0), db: Session = Depends(get_read_db)):
+    # Binary snapshot for kiosks; the format is documented in member_snapshot.py
+    return Response(content=build_snapshot(db, since), media_type="application/octet-stream")
+
 @app.get("/members/verify_by_id/{member_code}", response_model=schemas.MemberBasic)
-def verify_member_by_id(member_code: str, db: Session = Depends(get_db)):
+def verify_member_by_id(member_code: str, db: Session = Depends(get_read_db)):
     print(f"Verifying member by ID: {member_code}")
-    member = db.query(models.Member).filter(models.Member.member_code == member_code).first()
+    member = db.query(models.Member).filter(models.Member.member_code == member_code, models.Member.is_deleted == False).first()
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
     return member
 
 @app.get("/members/verify/{name}", response_model=schemas.MemberBasic)
-def verify_member(name: str, phone: str, db: Session = Depends(get_db)):
+def verify_member(name: str, phone: str, db: Session = Depends(get_read_db)):
     print(f"Verifying member: {name}, {phone}")
     member = db.query(models.Member).filter(
         models.Member.name == name,
-        models.Member.phone == phone
+        models.Member.phone == phone,
+        models.Member.is_deleted == False
     ).first()
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
     return member
 
 @app.post("/admin/attendance/{member_id}", response_model=schemas.AttendanceOut)
-def mark_attendance(member_id: int, db: Session = Depends(get_db), current_admin: models.Admin = Depends(get_current_admin)):
+def mark_attendance(member_id: int, db: Session = Depends(get_db), branch: Branch = Depends(get_branch), current_admin: models.Admin = Depends(get_current_admin)):
     attendance = models.Attendance(member_id=member_id)
     db.add(attendance)
+    db.flush()
+    branch.bus.publish(db, "attendance", "created", attendance.id)
     db.commit()
     db.refresh(attendance)
+    branch.record_check_in(attendance, attendance.member)
     return attendance
 
 @app.get("/admin/attendance/{member_id}", response_model=List[schemas.AttendanceOut])
-def get_member_attendance(member_id: int, db: Session = Depends(get_db), current_admin: models.Admin = Depends(get_current_admin)):
-    return db.query(models.Attendance).filter(models.Attendance.member_id == member_id).order_by(models.Attendance.check_in_time.desc()).all()
+def get_member_attendance(member_id: int, since: Optional[datetime] = None, until: Optional[datetime] = None, db: Session = Depends(get_read_db), current_admin: models.Admin = Depends(get_current_admin)):
+    # Reads attendances_archive as well when the range reaches past the hot window
+    return attendance_history(db, member_id, settings.attendance_hot_days, since=since, until=until)
 
 @app.get("/attendance/today", response_model=List[schemas.AttendanceOut])
-async def get_today_attendance(db: Session = Depends(get_db)):
+async def get_today_attendance(db: Session = Depends(get_read_db)):
     print("Processing today's attendance request...")
     try:
         today = datetime.now().date()
@@ -198,52 +453,134 @@ async def get_today_attendance(db: Session = Depends(get_db)):
         print(f"Error in get_today_attendance: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/attendance/changes", response_model=schemas.AttendanceChanges)
+def get_attendance_changes(since: Optional[int] = None, limit: int = Query(500, ge=1, le=5000), open_from: Optional[int] = None, db: Session = Depends(get_read_db)):
+    # Without a cursor: today's check-ins and the cursor to poll with from then on
+    if since is None:
+        return attendance_snapshot(db)
+    return attendance_changes(db, since, limit, open_from)
+
+@app.get("/attendance/stream")
+async def stream_attendance(request: Request, last_event_id: Optional[int] = Header(None), branch: Branch = Depends(get_branch)):
+    async def events():
+        async with branch.feed.subscribe() as subscriber:
+            # Replay what a reconnecting client missed; subscribed first so nothing falls in between
+            replayed = set()
+            if last_event_id is not None:
+                db = branch.ReadSessionLocal()
+                try:
+                    cursor, has_more = last_event_id, True
+                    while has_more:
+                        missed = await run_in_threadpool(attendance_changes, db, cursor, 5000)
+                        for attendance in missed["changes"]:
+                            replayed.add(attendance.id)
+                            yield format_event(attendance.id, schemas.AttendanceOut.from_orm(attendance).json())
+                        cursor = missed["cursor"]
+                        has_more = missed["has_more"]
+                finally:
+                    db.close()
+            while not subscriber.overflowed:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event_id, payload = await asyncio.wait_for(subscriber.queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                # Live events arrive out of id order (concurrent requests, other workers'
+                # check-ins a poll late), so only the ones already replayed are skipped
+                if event_id in replayed:
+                    replayed.discard(event_id)
+                    continue
+                yield format_event(event_id, payload)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/attendance/recent", response_model=List[schemas.AttendanceOut])
-def get_recent_attendance(db: Session = Depends(get_db)):
+def get_recent_attendance(db: Session = Depends(get_read_db)):
     return db.query(models.Attendance).order_by(models.Attendance.check_in_time.desc()).limit(10).all()
 
-@app.post("/payments/", response_model=schemas.Payment)
-def create_payment(payment: schemas.PaymentCreate, db: Session = Depends(get_db), current_admin: models.Admin = Depends(get_current_admin)):
-    # Check if payment reference already exists
-    existing_payment = db.query(models.Payment).filter(models.Payment.payment_reference == payment.payment_reference).first()
-    if existing_payment:
-        raise HTTPException(status_code=400, detail="Payment reference already exists")
+@app.get("/analytics/traffic", response_model=schemas.TrafficReport)
+def get_traffic(since: Optional[datetime] = None, until: Optional[datetime] = None, membership_type: Optional[str] = None, db: Session = Depends(get_read_db), branch: Branch = Depends(get_branch), current_admin: models.Admin = Depends(get_current_admin)):
+    # Loaded from the database on first use, kept current by Branch.record_check_in
+    if not branch.columns.loaded:
+        branch.columns.load(db)
+    return branch.columns.traffic(since=since, until=until, membership_type=membership_type)
+
+@app.get("/analytics/members/{member_code}", response_model=schemas.MemberActivity)
+def get_member_activity(member_code: str, db: Session = Depends(get_read_db), branch: Branch = Depends(get_branch), current_admin: models.Admin = Depends(get_current_admin)):
+    member = db.query(models.Member).filter(models.Member.member_code == member_code, models.Member.is_deleted == False).first()
+    if not member:
+        raise HTTPException(status_code=404, detail="Member not found")
+    if not branch.bitmaps.loaded:
+        branch.bitmaps.load(db)
+    return {"member_code": member.member_code, "name": member.name, **branch.bitmaps.member_stats(member.id)}
+
+@app.get("/analytics/at-risk", response_model=List[schemas.AtRiskMember])
+def get_at_risk_members(min_score: float = Query(0.5, ge=0, le=1), limit: int = Query(50, ge=1, le=1000), db: Session = Depends(get_read_db), branch: Branch = Depends(get_branch), current_admin: models.Admin = Depends(get_current_admin)):
+    if not branch.bitmaps.loaded:
+        branch.bitmaps.load(db)
+    members = db.query(models.Member.id, models.Member.member_code, models.Member.name).filter(
+        models.Member.membership_status == True,
+        models.Member.is_deleted == False
+    ).all()
+    scores = branch.bitmaps.at_risk([member.id for member in members])
+    at_risk = [
+        {"member_code": member.member_code, "name": member.name, **scores[member.id]}
+        for member in members
+        if member.id in scores and scores[member.id]["risk_score"] >= min_score
+    ]
+    at_risk.sort(key=lambda x: (x["risk_score"], x["days_since_last_visit"] or 0), reverse=True)
+    return at_risk[:limit]
 
+@app.post("/payments/", response_model=schemas.Payment)
+def create_payment(payment: schemas.PaymentCreate, db: Session = Depends(get_db), branch: Branch = Depends(get_branch), current_admin: models.Admin = Depends(get_current_admin)):
     # Verify member exists and is active
-    member = db.query(models.Member).filter(models.Member.id == payment.member_id).first()
+    member = db.query(models.Member).filter(models.Member.id == payment.member_id, models.Member.is_deleted == False).first()
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
     if not member.membership_status:
         raise HTTPException(status_code=403, detail="Member's membership is inactive")
 
-    # Create payment
-    db_payment = models.Payment(**payment.dict())
-    db.add(db_payment)
+    # Create payment; the unique payment_reference index rejects duplicates
+    db_payment = db.scalars(
+        database.insert_unless_conflict(db, models.Payment).values(**payment.dict()).returning(models.Payment)
+    ).first()
+    if db_payment is None:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Payment reference already exists")
     
     # Update member's membership status
     member.membership_status = True
+    branch.bus.publish(db, "payment", "created", db_payment.id)
     
     db.commit()
     db.refresh(db_payment)
     return db_payment
 
 @app.post("/admin/register", response_model=schemas.Admin)
-def create_admin(admin: schemas.AdminCreate, db: Session = Depends(get_db)):
-    # Check if admin already exists
-    db_admin = db.query(models.Admin).filter(models.Admin.username == admin.username).first()
-    if db_admin:
-        raise HTTPException(status_code=400, detail="Username already registered")
-    
-    # Create new admin with hashed password
+def create_admin(admin: schemas.AdminCreate, db: Session = Depends(get_admin_db)):
+    # Create new admin with hashed password; the unique username index rejects duplicates
     hashed_password = auth.get_password_hash(admin.password)
-    db_admin = models.Admin(username=admin.username, hashed_password=hashed_password)
-    db.add(db_admin)
+    db_admin = db.scalars(
+        database.insert_unless_conflict(db, models.Admin)
+        .values(username=admin.username, hashed_password=hashed_password)
+        .returning(models.Admin)
+    ).first()
+    if db_admin is None:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Username already registered")
+    default_branch.bus.publish(db, "admin", "created", db_admin.id)
     db.commit()
     db.refresh(db_admin)
     return db_admin
 
 @app.post("/admin/login", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), branch: Optional[str] = None, db: Session = Depends(get_admin_read_db)):
     admin = auth.authenticate_admin(db, form_data.username, form_data.password)
     if not admin:
         raise HTTPException(
@@ -251,23 +588,70 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Optional home branch for the session, carried in the token
+    token_data = {"sub": admin.username}
+    if branch is not None:
+        if branch not in branches:
+            raise HTTPException(status_code=404, detail="Unknown branch")
+        token_data["branch"] = branch
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": admin.username}, expires_delta=access_token_expires
+        data=token_data, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+def _branch_summary(branch: Branch) -> dict:
+    summary = branch.dashboard.get()
+    return {
+        "branch": branch.key,
+        "total_members": summary.total_members,
+        "active_members": summary.active_members,
+        "inactive_members": summary.inactive_members,
+        "today_check_ins": summary.today_check_ins,
+        "occupancy": branch.occupancy.count,
+    }
+
+@app.get("/reports/branches", response_model=schemas.BranchReport)
+async def get_branch_report(current_admin: models.Admin = Depends(get_current_admin)):
+    # Each branch is its own database, so query them all concurrently and merge
+    summaries = await asyncio.gather(*(run_in_threadpool(_branch_summary, branch) for branch in branches.values()))
+    totals = {"branch": "all"}
+    for field in ("total_members", "active_members", "inactive_members", "today_check_ins", "occupancy"):
+        totals[field] = sum(summary[field] for summary in summaries)
+    return {"branches": summaries, "totals": totals}
+
+# Cached for a few seconds per branch; concurrent misses share one computation
+@app.get("/dashboard/summary", response_model=schemas.DashboardSummary)
+def get_dashboard_summary(branch: Branch = Depends(get_branch), current_admin: models.Admin = Depends(get_current_admin)):
+    return branch.dashboard.get()
+
+@app.get("/admin/profiles", response_model=List[schemas.ProfileInfo])
+def list_profiles(current_admin: models.Admin = Depends(get_current_admin)):
+    return profile_store.list()
+
+@app.get("/admin/profiles/{name}")
+def download_profile(name: str, current_admin: models.Admin = Depends(get_current_admin)):
+    path = profile_store.path_for(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
+
 @app.get("/admin/me", response_model=schemas.Admin)
 async def read_admin_me(current_admin: models.Admin = Depends(get_current_admin)):
     return current_admin
 
 @app.delete("/members/{member_code}", response_model=schemas.Member)
-def delete_member(member_code: str, db: Session = Depends(get_db), current_admin: models.Admin = Depends(get_current_admin)):
-    member = db.query(models.Member).filter(models.Member.member_code == member_code).first()
+def delete_member(member_code: str, db: Session = Depends(get_db), branch: Branch = Depends(get_branch), current_admin: models.Admin = Depends(get_current_admin)):
+    member = db.query(models.Member).filter(models.Member.member_code == member_code, models.Member.is_deleted == False).first()
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
     
-    # Hard delete - remove from database
-    db.delete(member)
+    # Soft delete - the row and its history are purged later by the background job
+    member.is_deleted = True
+    member.deleted_at = datetime.utcnow()
+    member.version = next_version(db)
+    branch.bus.publish(db, "member", "deleted", member.id)
     db.commit()
+    branch.dashboard.invalidate()
+    db.refresh(member)
     return member
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""Per-member attendance bitmaps for streaks, visit frequency and churn risk.
+
+Each member owns one row of a packed bit matrix with one bit per gym-local
+day (Asia/Kathmandu), counted from a shared origin day so every row lines up
+on the same day axis. Rows are built from the database on first use and the
+check-in path sets one bit per visit. A single member's stats read one row;
+the at-risk report unpacks one window of columns for all members at once
+and scores them with array operations, with no per-member queries.
+"""
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models, utils
+
+
+def local_date(dt: datetime) -> date:
+    return utils.convert_to_nepal_time(dt).date()
+
+
+class AttendanceBitmaps:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[int, int] = {}
+        self._join_days = np.zeros(0, dtype=np.int32)
+        self._bits = np.zeros((0, 0), dtype=np.uint8)
+        self.origin: Optional[date] = None
+        self.loaded = False
+        self._max_loaded_id = 0
+
+    def _day(self, day: date) -> int:
+        return (day - self.origin).days
+
+    def _reserve(self, rows: int, days: int):
+        """Grow the matrix (doubling) to hold at least `rows` members and `days` days."""
+        height, width = self._bits.shape
+        need_width = (days + 7) // 8
+        if rows <= height and need_width <= width:
+            return
+        new_height = height if rows <= height else max(rows, 2 * height)
+        new_width = width if need_width <= width else max(need_width, 2 * width)
+        grown = np.zeros((new_height, new_width), dtype=np.uint8)
+        grown[:height, :width] = self._bits
+        self._bits = grown
+        if len(self._join_days) < grown.shape[0]:
+            self._join_days = np.resize(self._join_days, grown.shape[0])
+
+    def _row(self, member_id: int, join_day: int) -> int:
+        row = self._rows.get(member_id)
+        if row is None:
+            row = len(self._rows)
+            self._reserve(row + 1, join_day + 1)
+            self._rows[member_id] = row
+            self._join_days[row] = max(join_day, 0)
+        return row
+
+    def _set(self, rows: np.ndarray, days: np.ndarray):
+        np.bitwise_or.at(self._bits, (rows, days >> 3), (0x80 >> (days & 7)).astype(np.uint8))
+
+    def load(self, db: Session):
+        with self._lock:
+            if self.loaded:
+                return
+            members = db.query(models.Member.id, models.Member.created_at).all()
+            visits = []
+            for model in (models.Attendance, models.AttendanceArchive):
+                visits.extend(db.query(model.id, model.member_id, model.check_in_time).filter(model.member_id.isnot(None)).all())
+
+            today = local_date(utils.get_current_nepal_time())
+            join_dates = {id: local_date(created_at) if created_at else today for id, created_at in members}
+            visit_dates = [local_date(check_in_time) for _, _, check_in_time in visits]
+            self.origin = min([today, *join_dates.values(), *visit_dates])
+
+            self._reserve(len(members), self._day(today) + 1)
+            for member_id, join_date in join_dates.items():
+                self._row(member_id, self._day(join_date))
+            rows = np.array([self._row(member_id, self._day(day)) for (_, member_id, _), day in zip(visits, visit_dates)], dtype=np.int64)
+            days = np.array([self._day(day) for day in visit_dates], dtype=np.int64)
+            self._reserve(len(self._rows), int(days.max()) + 1 if days.size else 0)
+            if rows.size:
+                self._set(rows, days)
+                # Imported history can predate the member record
+                np.minimum.at(self._join_days, rows, days.astype(np.int32))
+            self._max_loaded_id = max((id for id, _, _ in visits), default=0)
+            self.loaded = True
+
+    def mark(self, attendance_id: int, member_id: int, check_in_time: datetime):
+        with self._lock:
+            # Before load() there is nothing to mark, and rows load() already read are skipped
+            if not self.loaded or member_id is None or attendance_id <= self._max_loaded_id:
+                return
+            day = self._day(local_date(check_in_time))
+            if day < 0:
+                return
+            row = self._row(member_id, day)
+            self._join_days[row] = min(self._join_days[row], day)
+            self._reserve(len(self._rows), day + 1)
+            self._set(np.array([row]), np.array([day]))
+
+    def _window(self, rows: np.ndarray, first_day: int, last_day: int) -> np.ndarray:
+        """Unpacked visit flags for `rows` over [first_day, last_day], as a bool matrix."""
+        first_byte, last_byte = first_day >> 3, (last_day >> 3) + 1
+        packed = np.zeros((len(rows), last_byte - first_byte), dtype=np.uint8)
+        width = min(self._bits.shape[1], last_byte) - first_byte
+        if width > 0:
+            packed[:, :width] = self._bits[rows, first_byte:first_byte + width]
+        bits = np.unpackbits(packed, axis=1)
+        start = first_day - (first_byte << 3)
+        return bits[:, start:start + last_day - first_day + 1].astype(bool)
+
+    def member_stats(self, member_id: int) -> dict:
+        with self._lock:
+            today = self._day(local_date(utils.get_current_nepal_time()))
+            row = self._rows.get(member_id)
+            join_day = int(self._join_days[row]) if row is not None else today
+            visits = self._window(np.array([row]), join_day, today)[0] if row is not None else np.zeros(1, dtype=bool)
+
+        # A streak is still alive if today's visit just hasn't happened yet
+        trailing = visits if visits[-1] else visits[:-1]
+        misses = np.flatnonzero(~trailing[::-1])
+        streak = int(misses[0]) if misses.size else int(trailing.size)
+        visited = np.flatnonzero(visits)
+        weeks = max(visits.size / 7, 1)
+        return {
+            "current_streak": streak,
+            "visits_last_7_days": int(visits[-7:].sum()),
+            "visits_last_28_days": int(visits[-28:].sum()),
+            "total_visits": int(visits.sum()),
+            "visits_per_week": round(float(visits.sum()) / weeks, 2),
+            "last_visit": self.origin + timedelta(days=join_day + int(visited[-1])) if visited.size else None,
+            "days_since_last_visit": int(visits.size - 1 - visited[-1]) if visited.size else None,
+        }
+
+    def at_risk(self, member_ids: List[int], window_days: int = 56, recent_days: int = 14) -> dict:
+        """Churn-risk scores for `member_ids`, in one vectorized pass.
+
+        The window is split into a baseline (older part) and a recent part. A
+        member's score is how far the recent visit rate has fallen below their
+        own baseline rate: 0 means no drop, 1 means they stopped coming.
+        Members with no baseline visits score 0.
+        """
+        with self._lock:
+            today = self._day(local_date(utils.get_current_nepal_time()))
+            first_day = max(today - window_days + 1, 0)
+            known = [member_id for member_id in member_ids if member_id in self._rows]
+            rows = np.array([self._rows[member_id] for member_id in known], dtype=np.int64)
+            visits = self._window(rows, first_day, today)
+            join_days = self._join_days[rows] if rows.size else np.zeros(0, dtype=np.int32)
+
+        split = max(visits.shape[1] - recent_days, 0)
+        baseline_visits = visits[:, :split].sum(axis=1)
+        recent_visits = visits[:, split:].sum(axis=1)
+        baseline_days = np.clip(first_day + split - np.maximum(join_days, first_day), 0, None)
+        baseline_rate = np.divide(baseline_visits, baseline_days, out=np.zeros(len(rows)), where=baseline_days > 0)
+        recent_rate = recent_visits / max(visits.shape[1] - split, 1)
+        score = np.where(
+            baseline_rate > 0,
+            np.clip(1 - np.divide(recent_rate, baseline_rate, out=np.zeros(len(rows)), where=baseline_rate > 0), 0, 1),
+            0.0,
+        )
+        any_visit = visits.any(axis=1)
+        days_since = np.where(any_visit, visits[:, ::-1].argmax(axis=1), -1)
+
+        return {
+            member_id: {
+                "risk_score": round(float(score[i]), 3),
+                "recent_visits": int(recent_visits[i]),
+                "baseline_visits": int(baseline_visits[i]),
+                "days_since_last_visit": int(days_since[i]) if days_since[i] >= 0 else None,
+            }
+            for i, member_id in enumerate(known)
+        }
@@ -0,0 +1,98 @@
+"""Set-based bulk member operations for POST /members/bulk-update.
+
+The target members are resolved once, by member code or by filter, and the
+action is applied as chunked `UPDATE ... WHERE id IN (...)` statements in
+a single transaction. Each UPDATE only touches rows that actually change and
+RETURNs their ids. Those ids get a new snapshot version (member_snapshot.py)
+and a change notice on the invalidation bus; the counts are reported back.
+"""
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import and_, exists, select, update
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .member_snapshot import next_version
+
+CHUNK_SIZE = 500
+
+
+def _chunks(items: List, size: int = CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _filter_conditions(member_filter: schemas.MemberFilter):
+    conditions = []
+    if member_filter.membership_type is not None:
+        conditions.append(models.Member.membership_type == member_filter.membership_type)
+    if member_filter.membership_status is not None:
+        conditions.append(models.Member.membership_status == member_filter.membership_status)
+    if member_filter.created_after is not None:
+        conditions.append(models.Member.created_at >= member_filter.created_after)
+    if member_filter.created_before is not None:
+        conditions.append(models.Member.created_at < member_filter.created_before)
+    if member_filter.paid_until_before is not None:
+        conditions.append(~exists().where(
+            models.Payment.member_id == models.Member.id,
+            models.Payment.next_due_date >= member_filter.paid_until_before,
+        ))
+    return conditions
+
+
+def _resolve(db: Session, request: schemas.MemberBulkUpdate):
+    """Ids of the live members targeted, plus any requested codes that matched none."""
+    live = models.Member.is_deleted == False
+    if request.member_codes is None:
+        ids = db.execute(
+            select(models.Member.id).where(live, *_filter_conditions(request.filter)).order_by(models.Member.id)
+        ).scalars().all()
+        return ids, []
+
+    codes = list(dict.fromkeys(request.member_codes))
+    found = {}
+    for chunk in _chunks(codes):
+        found.update(db.execute(
+            select(models.Member.member_code, models.Member.id).where(live, models.Member.member_code.in_(chunk))
+        ).all())
+    return sorted(found.values()), [code for code in codes if code not in found]
+
+
+def _changes(request: schemas.MemberBulkUpdate):
+    """(values to set, condition for rows that would actually change)."""
+    if request.action == "activate":
+        return {"membership_status": True}, models.Member.membership_status.isnot(True)
+    if request.action == "deactivate":
+        return {"membership_status": False}, models.Member.membership_status.isnot(False)
+    if request.action == "change_type":
+        return {"membership_type": request.membership_type}, models.Member.membership_type != request.membership_type
+    return {"is_deleted": True, "deleted_at": datetime.utcnow()}, models.Member.is_deleted == False
+
+
+def bulk_update_members(db: Session, request: schemas.MemberBulkUpdate, bus) -> dict:
+    """Apply `request` in one transaction; the caller's session is committed here."""
+    ids, not_found = _resolve(db, request)
+    values, changes = _changes(request)
+    action = "deleted" if request.action == "delete" else "updated"
+
+    updated = 0
+    try:
+        version = next_version(db) if ids else None
+        for chunk in _chunks(ids):
+            changed_ids = db.execute(
+                update(models.Member)
+                .where(and_(models.Member.id.in_(chunk), changes))
+                .values(**values, version=version)
+                .returning(models.Member.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            bus.publish_many(db, "member", action, changed_ids)
+            updated += len(changed_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    print(f"Bulk {request.action}: {len(ids)} matched, {updated} updated")
+    return {"action": request.action, "matched": len(ids), "updated": updated, "not_found": not_found}
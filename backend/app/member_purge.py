@@ -0,0 +1,78 @@
+"""Background purge of soft-deleted members.
+
+DELETE /members/{member_code} only flags the member. Once the grace period
+has passed, this job deletes the member's check-ins (hot and archived) and
+anonymizes the member row, in bounded batches with one transaction each so
+it never holds the write lock for long. The anonymized row stays behind as
+the target of the member's payment records.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+
+from . import models
+
+
+def _delete_attendance(session_factory, model, member_ids, batch_size: int) -> int:
+    deleted = 0
+    while True:
+        db = session_factory()
+        try:
+            ids = select(model.id).where(model.member_id.in_(member_ids)).limit(batch_size).scalar_subquery()
+            result = db.execute(delete(model).where(model.id.in_(ids)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+def purge_deleted_members(session_factory, grace_days: int, batch_size: int = 500) -> int:
+    """Purge members deleted more than `grace_days` ago. Returns the number purged."""
+    cutoff = datetime.utcnow() - timedelta(days=grace_days)
+    purged = 0
+    while True:
+        db = session_factory()
+        try:
+            member_ids = db.execute(
+                select(models.Member.id).where(
+                    models.Member.is_deleted == True,
+                    models.Member.purged_at.is_(None),
+                    models.Member.deleted_at < cutoff,
+                ).limit(batch_size)
+            ).scalars().all()
+        finally:
+            db.close()
+        if not member_ids:
+            break
+
+        for model in (models.Attendance, models.AttendanceArchive):
+            _delete_attendance(session_factory, model, member_ids, batch_size)
+
+        db = session_factory()
+        try:
+            db.execute(
+                update(models.Member)
+                .where(models.Member.id.in_(member_ids))
+                .values(
+                    name="Deleted member",
+                    phone="deleted-" + models.Member.id.cast(models.Member.phone.type),
+                    purged_at=datetime.utcnow(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        purged += len(member_ids)
+
+    if purged:
+        print(f"Purged {purged} deleted members")
+    return purged
@@ -0,0 +1,95 @@
+"""Compact member snapshot for kiosk-side verification.
+
+Kiosks keep a local copy of every live member so a typed member code can be
+checked without a round trip; POST /attendance/mark stays the authority.
+
+Every member change the kiosk cares about (created, deleted, status changed)
+sets `members.version` to the next value of the `member_versions` counter.
+Taking a value locks the counter row until the transaction commits, so
+versions become visible in the order they were handed out (on Postgres as
+well as SQLite): once a kiosk has seen version N, no change with a lower
+version can still appear, and it only needs the rows above N.
+
+Wire format (little-endian), served by GET /members/snapshot:
+
+    header  48 bytes  magic b"GMS1", flags u16 (1 = delta), reserved u16,
+                      version u64, since u64, count u32, salt 16s, 4 pad
+    records count x 40 bytes
+                      member_code 16s (NUL padded), phone_hash 16s,
+                      status u8 (1 = active, 2 = removed), pad, name_len u16,
+                      name_offset u32 (into the names block)
+    names   UTF-8 names, concatenated
+
+Records are fixed width, so a saved file can be memory-mapped and searched
+in place. A full snapshot is sorted by member_code (binary-searchable) and
+never contains removed members; a delta is in version order and must be
+applied in that order. Phones are never shipped, only
+sha256(salt + phone) truncated to 16 bytes.
+"""
+import hashlib
+import struct
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+
+MAGIC = b"GMS1"
+HEADER = struct.Struct("<4sHHQQI16s4x")
+RECORD = struct.Struct("<16s16sBxHI")
+FLAG_DELTA = 1
+STATUS_ACTIVE = 1
+STATUS_REMOVED = 2
+
+SALT = hashlib.sha256(f"member-snapshot:{settings.jwt_secret_key}".encode()).digest()[:16]
+
+
+def phone_hash(phone: str, salt: bytes = SALT) -> bytes:
+    return hashlib.sha256(salt + phone.encode()).digest()[:16]
+
+
+def next_version(db: Session) -> int:
+    """Take the next member version; the counter stays locked until `db` commits or rolls back."""
+    return db.execute(
+        update(models.MemberVersion)
+        .where(models.MemberVersion.id == 1)
+        .values(value=models.MemberVersion.value + 1)
+        .returning(models.MemberVersion.value)
+    ).scalar_one()
+
+
+def current_version(db: Session) -> int:
+    return db.query(models.MemberVersion.value).filter(models.MemberVersion.id == 1).scalar() or 0
+
+
+def build_snapshot(db: Session, since: Optional[int] = None) -> bytes:
+    """A delta since `since`, or a full snapshot when `since` is missing or unknown."""
+    version = current_version(db)
+    delta = since is not None and since <= version
+    query = db.query(
+        models.Member.member_code,
+        models.Member.phone,
+        models.Member.name,
+        models.Member.membership_status,
+        models.Member.is_deleted,
+    ).filter(models.Member.version <= version)
+    if delta:
+        rows = query.filter(models.Member.version > since).order_by(models.Member.version).all()
+    else:
+        rows = query.filter(models.Member.is_deleted == False).order_by(models.Member.member_code).all()
+
+    records = []
+    names = bytearray()
+    for member_code, phone, name, membership_status, is_deleted in rows:
+        encoded_name = name.encode()
+        status = STATUS_REMOVED if is_deleted else (STATUS_ACTIVE if membership_status else 0)
+        records.append(RECORD.pack(
+            member_code.encode()[:16], phone_hash(phone), status, len(encoded_name), len(names)
+        ))
+        names += encoded_name
+    header = HEADER.pack(
+        MAGIC, FLAG_DELTA if delta else 0, 0, version, since if delta else 0, len(records), SALT
+    )
+    return header + b"".join(records) + bytes(names)
@@ -1,34 +1,53 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, ForeignKey, Index, false, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
 
+# Partial-index predicate: lookups only index live members, and queries must
+# filter on `is_deleted == False` for the planner to use these indexes.
+LIVE_MEMBER = dict(sqlite_where=text('is_deleted = 0'), postgresql_where=text('is_deleted = false'))
+
 class Member(Base):
     __tablename__ = "members"
     __table_args__ = (
-        Index('idx_member_phone', 'phone'),
-        Index('idx_member_status', 'membership_status'),
+        Index('idx_member_phone', 'phone', unique=True, **LIVE_MEMBER),
+        Index('idx_member_status', 'membership_status', **LIVE_MEMBER),
         Index('idx_member_name', 'name'),
-        Index('idx_member_member_code', 'member_code'),
+        Index('idx_member_member_code', 'member_code', unique=True, **LIVE_MEMBER),
+        Index('idx_member_version', 'version'),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    member_code = Column(String, unique=True, nullable=False)
+    # Unique among live members (see the partial indexes above)
+    member_code = Column(String, nullable=False)
     name = Column(String, nullable=False)
-    phone = Column(String, unique=True, nullable=False)
+    phone = Column(String, nullable=False)
     membership_type = Column(String, nullable=False)
     membership_status = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    is_deleted = Column(Boolean, default=False)
+    is_deleted = Column(Boolean, default=False, server_default=false(), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    purged_at = Column(DateTime(timezone=True), nullable=True)
+    # Bumped on every change the kiosk snapshot cares about (see member_snapshot.py)
+    version = Column(Integer, nullable=False, default=0, server_default='0')
     attendances = relationship("Attendance", back_populates="member")
     payments = relationship("Payment", back_populates="member")
 
+class MemberVersion(Base):
+    """Single-row counter handing out members.version (see member_snapshot.py)."""
+    __tablename__ = "member_versions"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    value = Column(Integer, nullable=False)
+
 class Attendance(Base):
     __tablename__ = "attendances"
     __table_args__ = (
         Index('idx_attendance_member', 'member_id'),
         Index('idx_attendance_date', 'check_in_time'),
+        # Ids must never be reused after archive.py or member_purge.py delete the newest rows
+        {'sqlite_autoincrement': True},
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -37,12 +56,42 @@ class Attendance(Base):
     check_out_time = Column(DateTime(timezone=True), nullable=True)
     member = relationship("Member", back_populates="attendances")
 
+class AttendanceArchive(Base):
+    """Check-ins older than the hot window, moved out of `attendances` by archive.py."""
+    __tablename__ = "attendances_archive"
+    __table_args__ = (
+        Index('idx_attendance_archive_member', 'member_id'),
+        Index('idx_attendance_archive_date', 'check_in_time'),
+    )
+
+    # Keeps the id the row had in `attendances`
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    member_id = Column(Integer, ForeignKey("members.id"))
+    check_in_time = Column(DateTime(timezone=True))
+    check_out_time = Column(DateTime(timezone=True), nullable=True)
+    member = relationship("Member", viewonly=True)
+
+class ChangeLog(Base):
+    """Entity-level change notices that keep other workers' caches fresh (see invalidation.py)."""
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index('idx_change_log_created', 'created_at'),
+        # Ids must never be reused after prune() empties the table: workers poll with id > cursor
+        {'sqlite_autoincrement': True},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)
+    action = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=True)
+    origin = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class Payment(Base):
     __tablename__ = "payments"
     __table_args__ = (
         Index('idx_payment_member', 'member_id'),
         Index('idx_payment_date', 'payment_date'),
-        Index('idx_payment_reference', 'payment_reference'),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -50,14 +99,12 @@ class Payment(Base):
     amount = Column(Float)
     payment_date = Column(DateTime(timezone=True), server_default=func.now())
     next_due_date = Column(DateTime(timezone=True))
+    # One unique index (ix_payments_payment_reference) serves lookups and uniqueness
     payment_reference = Column(String, unique=True, index=True)
     member = relationship("Member", back_populates="payments")
 
 class Admin(Base):
     __tablename__ = "admins"
-    __table_args__ = (
-        Index('idx_admin_username', 'username'),
-    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String, unique=True, index=True)
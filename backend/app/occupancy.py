@@ -0,0 +1,84 @@
+"""Live gym occupancy.
+
+An in-process counter of open sessions (checked in, not yet checked out).
+It is rebuilt from the database at startup, after a first auto-checkout
+pass, and then adjusted on every check-in, check-out and auto-checkout, so
+GET /occupancy never has to count rows. Sessions left open longer than the configured maximum are closed by
+`auto_checkout`, which runs as a periodic job.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+class OccupancyCounter:
+    def __init__(self):
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def checked_in(self, n: int = 1):
+        with self._lock:
+            self._count += n
+
+    def checked_out(self, n: int = 1):
+        with self._lock:
+            self._count = max(self._count - n, 0)
+
+    def rebuild(self, db: Session):
+        open_sessions = db.query(func.count(models.Attendance.id)).filter(
+            models.Attendance.check_out_time.is_(None)
+        ).scalar()
+        with self._lock:
+            self._count = open_sessions
+
+
+def _session_cutoff(max_session_minutes: int) -> datetime:
+    # check_in_time defaults to CURRENT_TIMESTAMP, i.e. naive UTC on SQLite
+    return datetime.utcnow() - timedelta(minutes=max_session_minutes)
+
+
+def auto_checkout(session_factory, max_session_minutes: int, counter: OccupancyCounter, bus=None) -> int:
+    """Close sessions open longer than the maximum, checking them out at check-in + max."""
+    max_session = timedelta(minutes=max_session_minutes)
+    db = session_factory()
+    try:
+        stale = db.query(models.Attendance.id, models.Attendance.check_in_time).filter(
+            models.Attendance.check_out_time.is_(None),
+            models.Attendance.check_in_time < _session_cutoff(max_session_minutes),
+        ).all()
+        if not stale:
+            return 0
+        # Conditional per-row updates: a manual check-out that lands between the
+        # SELECT and here keeps its time and is not counted a second time
+        closed = []
+        for id, check_in_time in stale:
+            result = db.execute(
+                update(models.Attendance)
+                .where(models.Attendance.id == id, models.Attendance.check_out_time.is_(None))
+                .values(check_out_time=check_in_time + max_session)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                closed.append(id)
+        if bus is not None:
+            bus.publish_many(db, "attendance", "updated", closed)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if not closed:
+        return 0
+    counter.checked_out(len(closed))
+    print(f"Auto-checked out {len(closed)} sessions")
+    return len(closed)
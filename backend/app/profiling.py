@@ -0,0 +1,174 @@
+"""Opt-in request profiling.
+
+With PROFILING_ENABLED the RequestProfiler middleware profiles a random
+PROFILING_SAMPLE_RATE fraction of requests, plus any request that sends
+`X-Profile-Request: 1` with a valid admin token. When profiling is disabled
+the middleware is never installed, so requests pay nothing.
+
+A profiled request runs under a sampling profiler: a thread that records the
+stack of every busy thread each PROFILING_INTERVAL_MS while the request is in
+flight. Sampling (rather than cProfile) is used because sync endpoints run on
+threadpool threads that a per-thread profiler would not see; the cost is that
+concurrent requests show up in each other's profiles.
+
+Profiles are written in the collapsed-stack format that flamegraph.pl and
+speedscope read ("frame;frame;frame count" per line), into a directory that
+keeps only the newest PROFILING_MAX_PROFILES files. GET /admin/profiles lists
+them and GET /admin/profiles/{name} downloads one.
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from starlette.concurrency import run_in_threadpool
+
+PROFILE_HEADER = b"x-profile-request"
+PROFILE_SUFFIX = ".folded"
+# <unix ms>_<duration ms>_<METHOD>_<path slug>.folded
+PROFILE_NAME = re.compile(r"^(\d+)_(\d+)_([A-Z]+)_([\w.-]*)\.folded$")
+APP_DIR = str(Path(__file__).resolve().parent)
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+_sampler_threads = set()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+    return f"{module}:{code.co_name}"
+
+
+def _is_idle(frame) -> bool:
+    # Waiting on a queue/selector with no application code on the stack: an
+    # idle pool worker or the event loop between events
+    if os.path.basename(frame.f_code.co_filename) not in IDLE_FILES:
+        return False
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(APP_DIR):
+            return False
+        frame = frame.f_back
+    return True
+
+
+class StackSampler:
+    def __init__(self, interval_ms: float):
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        _sampler_threads.add(threading.get_ident())
+        try:
+            while not self._stop.wait(self.interval):
+                self._sample()
+        finally:
+            _sampler_threads.discard(threading.get_ident())
+
+    def _sample(self):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id in _sampler_threads or _is_idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class ProfileStore:
+    """Bounded on-disk ring buffer of collapsed-stack profiles."""
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def _files(self):
+        if not self.directory.is_dir():
+            return []
+        return sorted(path for path in self.directory.iterdir() if PROFILE_NAME.match(path.name))
+
+    def save(self, method: str, path: str, duration_ms: float, stacks: Counter) -> str:
+        slug = re.sub(r"[^\w.-]+", "-", path).strip("-")[:80]
+        name = f"{int(time.time() * 1000)}_{int(duration_ms)}_{method}_{slug}{PROFILE_SUFFIX}"
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / name, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            for old in self._files()[:-self.max_profiles]:
+                old.unlink(missing_ok=True)
+        return name
+
+    def list(self):
+        profiles = []
+        for file in reversed(self._files()):
+            created_ms, duration_ms, method, slug = PROFILE_NAME.match(file.name).groups()
+            profiles.append({
+                "name": file.name,
+                "method": method,
+                "path": "/" + slug,
+                "duration_ms": int(duration_ms),
+                "size_bytes": file.stat().st_size,
+                "created_at": datetime.fromtimestamp(int(created_ms) / 1000, tz=timezone.utc),
+            })
+        return profiles
+
+    def path_for(self, name: str):
+        """The file for `name`, or None; only names in the store resolve."""
+        if not PROFILE_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+
+class RequestProfiler:
+    """Pure ASGI middleware; `is_admin(token)` decides whether the header is honoured."""
+
+    def __init__(self, app, store: ProfileStore, sample_rate: float, interval_ms: float, is_admin):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        self.is_admin = is_admin
+
+    def _wants_profile(self, scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        headers = dict(scope["headers"])
+        if headers.get(PROFILE_HEADER, b"") not in (b"1", b"true"):
+            return False
+        scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+        return scheme.lower() == "bearer" and bool(token) and self.is_admin(token)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        sampler = StackSampler(self.interval_ms)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.stop()
+            duration_ms = (time.perf_counter() - started) * 1000
+            name = await run_in_threadpool(self.store.save, scope["method"], scope["path"], duration_ms, sampler.stacks)
+            print(f"Profiled {scope['method']} {scope['path']} in {duration_ms:.1f}ms "
+                  f"({sampler.samples} samples): {name}")
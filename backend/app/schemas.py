@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional, List
+from pydantic import BaseModel, root_validator
+from datetime import date, datetime
+from typing import Dict, Literal, Optional, List
 
 class MemberBase(BaseModel):
     name: str
@@ -19,6 +19,38 @@ class Member(MemberBase):
     class Config:
         orm_mode = True
 
+class MemberFilter(BaseModel):
+    membership_type: Optional[str] = None
+    membership_status: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    # Members with no payment due on or after this date (lapsed, or never paid)
+    paid_until_before: Optional[datetime] = None
+
+class MemberBulkUpdate(BaseModel):
+    action: Literal["activate", "deactivate", "change_type", "delete"]
+    member_codes: Optional[List[str]] = None
+    filter: Optional[MemberFilter] = None
+    # New type for "change_type"
+    membership_type: Optional[str] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_target(cls, values):
+        if (values.get("member_codes") is None) == (values.get("filter") is None):
+            raise ValueError("Give either member_codes or filter")
+        member_filter = values.get("filter")
+        if member_filter is not None and not any(v is not None for v in member_filter.dict().values()):
+            raise ValueError("filter must set at least one field")
+        if values.get("action") == "change_type" and not values.get("membership_type"):
+            raise ValueError("membership_type is required for change_type")
+        return values
+
+class MemberBulkResult(BaseModel):
+    action: str
+    matched: int
+    updated: int
+    not_found: List[str] = []
+
 class MemberBasic(BaseModel):
     id: int
     member_code: str
@@ -45,6 +77,75 @@ class AttendanceOut(BaseModel):
     class Config:
         orm_mode = True
 
+class CheckOut(BaseModel):
+    id: int
+    check_out_time: datetime
+
+class AttendanceChanges(BaseModel):
+    cursor: int
+    changes: List[AttendanceOut]
+    has_more: bool
+    # Check-outs of rows at or after `open_from` that the client already has
+    check_outs: List[CheckOut] = []
+
+class Occupancy(BaseModel):
+    occupancy: int
+
+class TrafficReport(BaseModel):
+    total: int
+    days: List[str]
+    hour_of_week: List[List[int]]
+    by_hour: List[int]
+    peak_hour: Optional[int] = None
+    by_membership_type: Dict[str, int]
+
+class MemberActivity(BaseModel):
+    member_code: str
+    name: str
+    current_streak: int
+    visits_last_7_days: int
+    visits_last_28_days: int
+    total_visits: int
+    visits_per_week: float
+    last_visit: Optional[date] = None
+    days_since_last_visit: Optional[int] = None
+
+class AtRiskMember(BaseModel):
+    member_code: str
+    name: str
+    risk_score: float
+    recent_visits: int
+    baseline_visits: int
+    days_since_last_visit: Optional[int] = None
+
+class BranchSummary(BaseModel):
+    branch: str
+    total_members: int
+    active_members: int
+    inactive_members: int
+    today_check_ins: int
+    occupancy: int
+
+class BranchReport(BaseModel):
+    branches: List[BranchSummary]
+    totals: BranchSummary
+
+class DashboardSummary(BaseModel):
+    total_members: int
+    active_members: int
+    inactive_members: int
+    today_check_ins: int
+    recent_check_ins: List[AttendanceOut]
+    generated_at: datetime
+
+class ProfileInfo(BaseModel):
+    name: str
+    method: str
+    path: str
+    duration_ms: int
+    size_bytes: int
+    created_at: datetime
+
 class PaymentBase(BaseModel):
     member_id: int
     amount: float
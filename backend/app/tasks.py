@@ -0,0 +1,40 @@
+"""Periodic background jobs run from the FastAPI lifespan.
+
+Jobs are plain blocking functions; each run happens in the threadpool so the
+event loop keeps serving requests. A failing run is logged and retried on
+the next interval rather than killing the loop.
+"""
+import asyncio
+from typing import Callable, List
+
+from starlette.concurrency import run_in_threadpool
+
+
+async def _run_periodically(name: str, interval_seconds: float, job: Callable[[], object]):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_threadpool(job)
+        except Exception as e:
+            print(f"Background job {name} failed: {str(e)}")
+
+
+class PeriodicTasks:
+    def __init__(self):
+        self._jobs = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add(self, name: str, interval_seconds: float, job: Callable[[], object]):
+        self._jobs.append((name, interval_seconds, job))
+
+    def start(self):
+        for name, interval_seconds, job in self._jobs:
+            self._tasks.append(asyncio.create_task(
+                _run_periodically(name, interval_seconds, job), name=name
+            ))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,89 @@
+"""initial schema
+
+Matches the tables previously created by Base.metadata.create_all() in
+main.py. Databases created that way are stamped at this revision on first
+startup instead of being re-created (see app/startup.py).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'members',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('member_code', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('phone', sa.String(), nullable=False),
+        sa.Column('membership_type', sa.String(), nullable=False),
+        sa.Column('membership_status', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('member_code'),
+        sa.UniqueConstraint('phone'),
+    )
+    op.create_index('idx_member_phone', 'members', ['phone'])
+    op.create_index('idx_member_status', 'members', ['membership_status'])
+    op.create_index('idx_member_name', 'members', ['name'])
+    op.create_index('idx_member_member_code', 'members', ['member_code'])
+
+    op.create_table(
+        'admins',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('last_login', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_admins_username', 'admins', ['username'], unique=True)
+    op.create_index('idx_admin_username', 'admins', ['username'])
+
+    op.create_table(
+        'attendances',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('member_id', sa.Integer(), nullable=True),
+        sa.Column('check_in_time', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('check_out_time', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['member_id'], ['members.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_attendance_member', 'attendances', ['member_id'])
+    op.create_index('idx_attendance_date', 'attendances', ['check_in_time'])
+
+    op.create_table(
+        'payments',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('member_id', sa.Integer(), nullable=True),
+        sa.Column('amount', sa.Float(), nullable=True),
+        sa.Column('payment_date', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('next_due_date', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('payment_reference', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['member_id'], ['members.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_payment_member', 'payments', ['member_id'])
+    op.create_index('idx_payment_date', 'payments', ['payment_date'])
+    op.create_index('idx_payment_reference', 'payments', ['payment_reference'])
+    op.create_index('ix_payments_payment_reference', 'payments', ['payment_reference'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table('payments')
+    op.drop_table('attendances')
+    op.drop_table('admins')
+    op.drop_table('members')
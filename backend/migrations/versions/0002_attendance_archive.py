@@ -0,0 +1,34 @@
+"""attendance archive table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'attendances_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('member_id', sa.Integer(), nullable=True),
+        sa.Column('check_in_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('check_out_time', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['member_id'], ['members.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_attendance_archive_member', 'attendances_archive', ['member_id'])
+    op.create_index('idx_attendance_archive_date', 'attendances_archive', ['check_in_time'])
+
+
+def downgrade() -> None:
+    op.drop_table('attendances_archive')
@@ -0,0 +1,84 @@
+"""member soft delete and live-member partial indexes
+
+Replaces the table-wide UNIQUE constraints on members.phone and
+members.member_code, and the phone/member_code/status lookup indexes, with
+partial indexes over rows where is_deleted is false. Adds deleted_at and
+purged_at for the background purge.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+LIVE_MEMBER = dict(
+    sqlite_where=sa.text('is_deleted = 0'),
+    postgresql_where=sa.text('is_deleted = false'),
+)
+
+
+def _members_without_unique_constraints():
+    # SQLite's UNIQUE constraints on members are unnamed and can only be
+    # dropped by rebuilding the table from a definition that leaves them out.
+    return sa.Table(
+        'members', sa.MetaData(),
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('member_code', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('phone', sa.String(), nullable=False),
+        sa.Column('membership_type', sa.String(), nullable=False),
+        sa.Column('membership_status', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=True),
+        sa.Index('idx_member_name', 'name'),
+    )
+
+
+def upgrade() -> None:
+    op.execute("UPDATE members SET is_deleted = false WHERE is_deleted IS NULL")
+    op.drop_index('idx_member_phone', table_name='members')
+    op.drop_index('idx_member_status', table_name='members')
+    op.drop_index('idx_member_member_code', table_name='members')
+
+    if op.get_bind().dialect.name == 'sqlite':
+        batch = op.batch_alter_table('members', recreate='always', copy_from=_members_without_unique_constraints())
+    else:
+        op.drop_constraint('members_phone_key', 'members', type_='unique')
+        op.drop_constraint('members_member_code_key', 'members', type_='unique')
+        batch = op.batch_alter_table('members')
+
+    with batch as batch_op:
+        batch_op.alter_column('is_deleted', existing_type=sa.Boolean(), nullable=False, server_default=sa.false())
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('purged_at', sa.DateTime(timezone=True), nullable=True))
+
+    op.create_index('idx_member_phone', 'members', ['phone'], unique=True, **LIVE_MEMBER)
+    op.create_index('idx_member_status', 'members', ['membership_status'], **LIVE_MEMBER)
+    op.create_index('idx_member_member_code', 'members', ['member_code'], unique=True, **LIVE_MEMBER)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_member_member_code', table_name='members')
+    op.drop_index('idx_member_status', table_name='members')
+    op.drop_index('idx_member_phone', table_name='members')
+
+    with op.batch_alter_table('members') as batch_op:
+        batch_op.drop_column('purged_at')
+        batch_op.drop_column('deleted_at')
+        batch_op.alter_column('is_deleted', existing_type=sa.Boolean(), nullable=True, server_default=None)
+        batch_op.create_unique_constraint('members_member_code_key', ['member_code'])
+        batch_op.create_unique_constraint('members_phone_key', ['phone'])
+
+    op.create_index('idx_member_member_code', 'members', ['member_code'])
+    op.create_index('idx_member_status', 'members', ['membership_status'])
+    op.create_index('idx_member_phone', 'members', ['phone'])
@@ -0,0 +1,29 @@
+"""member snapshot version
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('members', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    # Existing rows get distinct versions so the first delta after upgrade is well defined
+    op.execute('UPDATE members SET version = id')
+    op.create_index('idx_member_version', 'members', ['version'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_member_version', table_name='members')
+    with op.batch_alter_table('members') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,26 @@
+"""drop duplicate payment_reference and username indexes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The unique ix_ indexes on the same columns already serve these lookups
+    op.drop_index('idx_payment_reference', table_name='payments')
+    op.drop_index('idx_admin_username', table_name='admins')
+
+
+def downgrade() -> None:
+    op.create_index('idx_admin_username', 'admins', ['username'])
+    op.create_index('idx_payment_reference', 'payments', ['payment_reference'])
@@ -0,0 +1,30 @@
+"""member version counter
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'member_versions',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute('INSERT INTO member_versions (id, value) SELECT 1, COALESCE(MAX(version), 0) FROM members')
+
+
+def downgrade() -> None:
+    op.drop_table('member_versions')
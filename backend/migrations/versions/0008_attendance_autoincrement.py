@@ -0,0 +1,43 @@
+"""attendances ids never reused
+
+Without AUTOINCREMENT SQLite hands out max(id) + 1, so deleting the newest
+check-ins (archive, member purge) let a new check-in reuse an id that
+attendance cursors and attendances_archive had already seen. Rebuilds the
+table with AUTOINCREMENT and starts its sequence above every id in either
+table. Postgres sequences never reuse values, so nothing changes there.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def _recreate(autoincrement: bool) -> None:
+    with op.batch_alter_table('attendances', recreate='always', table_kwargs={'sqlite_autoincrement': autoincrement}):
+        pass
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _recreate(True)
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'attendances'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'attendances', COALESCE(MAX(id), 0) FROM ("
+        "SELECT id FROM attendances UNION ALL SELECT id FROM attendances_archive)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _recreate(False)
@@ -1,13 +1,22 @@
 import streamlit as st
 import requests 
 import pandas as pd
+import os
 import random
 from datetime import datetime
 import pytz
 
+from member_snapshot import STATUS_ACTIVE, MemberSnapshot
+
 API_URL = "https://gym-management-system-ad16.onrender.com"
 # API_URL = "http://127.0.0.1:8000"
 
+# Set per kiosk when the gym runs several branches
+GYM_BRANCH = os.getenv("GYM_BRANCH")
+MEMBER_CODE_PREFIX = os.getenv("MEMBER_CODE_PREFIX", "TDFC")
+BRANCH_PARAMS = {"branch": GYM_BRANCH} if GYM_BRANCH else {}
+MEMBER_SNAPSHOT_PATH = os.getenv("MEMBER_SNAPSHOT_PATH", "member_snapshot.bin")
+
 # Page config
 st.set_page_config(page_title="Gym Management System", page_icon="assets/favicon.jpg", layout="wide")
 
@@ -24,6 +33,8 @@ if 'current_page' not in st.session_state:
     st.session_state.current_page = "📊 Dashboard"
 if 'form_submitted' not in st.session_state:
     st.session_state.form_submitted = False
+if 'attendance_cache' not in st.session_state:
+    st.session_state.attendance_cache = None
 
 # Function to handle admin login
 def login(username, password):
@@ -45,6 +56,39 @@ def logout():
     st.session_state.admin_username = None
     st.rerun()
 
+# Function to get today's attendance, syncing only new check-ins (and check-outs
+# of rows still open here) after the first load
+def fetch_today_attendance(headers):
+    today = datetime.now().date().isoformat()
+    cache = st.session_state.attendance_cache
+    if cache is None or cache["date"] != today:
+        response = requests.get(f"{API_URL}/attendance/changes", headers=headers)
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        cache = {"date": today, "cursor": data["cursor"], "rows": data["changes"]}
+    else:
+        has_more = True
+        while has_more:
+            params = {"since": cache["cursor"]}
+            open_ids = [row["id"] for row in cache["rows"] if row["check_out_time"] is None]
+            if open_ids:
+                params["open_from"] = min(open_ids)
+            response = requests.get(f"{API_URL}/attendance/changes", headers=headers, params=params)
+            if response.status_code != 200:
+                return None
+            data = response.json()
+            check_outs = {item["id"]: item["check_out_time"] for item in data["check_outs"]}
+            for row in cache["rows"]:
+                if row["id"] in check_outs:
+                    row["check_out_time"] = check_outs[row["id"]]
+            cache["rows"].extend(data["changes"])
+            cache["cursor"] = data["cursor"]
+            has_more = data["has_more"]
+    st.session_state.attendance_cache = cache
+    # Newest first, as /attendance/today returns them
+    return sorted(cache["rows"], key=lambda x: x["check_in_time"], reverse=True)
+
 # Add greetings list at the top of the file after imports
 greetings = [
     "Welcome, {name}! Let's make today a strong one! 💪🔥",
@@ -56,26 +100,52 @@ greetings = [
     "Welcome back, {name}! Your personal best is waiting to be broken today! 🎯🚴‍♂️"
 ]
 
+# Local copy of this branch's members, shared by every session of the kiosk
+@st.cache_resource
+def get_member_snapshot():
+    return MemberSnapshot(MEMBER_SNAPSHOT_PATH)
+
+# Looks the member up in the local snapshot; a miss forces one refresh in case
+# the member was added since. None means "ask the API".
+def find_local_member(member_code=None, name=None, phone=None):
+    snapshot = get_member_snapshot()
+    snapshot.refresh(API_URL, BRANCH_PARAMS)
+    lookup = (lambda: snapshot.lookup(member_code)) if member_code else (lambda: snapshot.find(name, phone))
+    member = lookup()
+    if member is None and snapshot.loaded and snapshot.refresh(API_URL, BRANCH_PARAMS, force=True):
+        member = lookup()
+    return snapshot, member
+
 # Function to mark attendance by ID
 def mark_attendance_by_id(member_id):
     try:
-        # Convert member_id to string and ensure it's in TDFC format
+        # Bare numbers get this kiosk's prefix; full codes route to their own branch
         member_id = str(member_id)
-        if not member_id.startswith('TDFC'):
-            member_id = f'TDFC{member_id.zfill(3)}'
-
-        # Use the member_id with TDFC format
-        response = requests.get(f"{API_URL}/members/verify_by_id/{member_id}")
-        if response.status_code == 404:
+        if member_id.isdigit():
+            member_id = f'{MEMBER_CODE_PREFIX}{member_id.zfill(3)}'
+
+        snapshot, member = find_local_member(member_code=member_id)
+        if member is not None:
+            if member["status"] != STATUS_ACTIVE:
+                st.error("❌ Your membership is inactive. Please contact the admin.")
+                return False
+            # Verified locally; the API still checks everything when marking
+            params = {"member_code": member["member_code"], "phone_hash": member["phone_hash"].hex()}
+        elif snapshot.loaded and member_id.startswith(MEMBER_CODE_PREFIX):
             st.error("❌ Invalid Member ID")
             return False
-        
-        member = response.json()
-        # Send data as query parameters
-        params = {
-            "member_code": member["member_code"],  # Use member_code instead of numeric ID
-            "phone": member["phone"]
-        }
+        else:
+            response = requests.get(f"{API_URL}/members/verify_by_id/{member_id}")
+            if response.status_code == 404:
+                st.error("❌ Invalid Member ID")
+                return False
+            
+            member = response.json()
+            # Send data as query parameters
+            params = {
+                "member_code": member["member_code"],  # Use member_code instead of numeric ID
+                "phone": member["phone"]
+            }
         response = requests.post(f"{API_URL}/attendance/mark", params=params)
         
         if response.status_code == 200:
@@ -102,15 +172,19 @@ def mark_attendance_by_id(member_id):
 # Function to mark attendance by name and phone
 def mark_attendance(name, phone):
     try:
-        # First verify member
-        response = requests.get(f"{API_URL}/members/verify/{name}", params={"phone": phone})
-        if response.status_code == 404:
+        # First verify member, locally when the snapshot is available
+        snapshot, member = find_local_member(name=name, phone=phone)
+        if member is None and snapshot.loaded:
             st.error("❌ User not found or not registered. Contact admin")
             return False
-        
-        member = response.json()
+        if member is None:
+            response = requests.get(f"{API_URL}/members/verify/{name}", params={"phone": phone, **BRANCH_PARAMS})
+            if response.status_code == 404:
+                st.error("❌ User not found or not registered. Contact admin")
+                return False
+            member = response.json()
         # Use member_code instead of id
-        response = requests.post(f"{API_URL}/attendance/mark", params={"member_id": member["member_code"], "phone": phone})
+        response = requests.post(f"{API_URL}/attendance/mark", params={"member_code": member["member_code"], "phone": phone})
         if response.status_code == 200:
             greeting = random.choice(greetings).format(name=member["name"])
             st.success(greeting)
@@ -208,32 +282,29 @@ if st.session_state.admin_token:
 
     if st.session_state.current_page == "📊 Dashboard":
         # Dashboard Overview
-        col1, col2, col3 = st.columns(3)
+        col1, col2, col3, col4 = st.columns(4)
         
         try:
-            # Fetch statistics
+            # Fetch statistics, counted server-side
             headers = {"Authorization": f"Bearer {st.session_state.admin_token}"}
-            
-            # Get all members
-            response = requests.get(f"{API_URL}/members/", headers=headers)
+            response = requests.get(f"{API_URL}/dashboard/summary", headers=headers)
             if response.status_code == 200:
-                members = response.json()
-                active_members = len([m for m in members if m['membership_status']])
+                summary = response.json()
                 
                 with col1:
-                    st.metric("Total Members", len(members))
+                    st.metric("Total Members", summary["total_members"])
                 with col2:
-                    st.metric("Active Members", active_members)
+                    st.metric("Active Members", summary["active_members"])
                 with col3:
-                    st.metric("Inactive Members", len(members) - active_members)
-
-            # Get today's attendance
-            response = requests.get(f"{API_URL}/attendance/today", headers=headers)
-            if response.status_code == 200:
-                today_attendance = response.json()
-                st.subheader("Today's Check-ins")
-                if today_attendance:
-                    df = pd.DataFrame(today_attendance)
+                    st.metric("Inactive Members", summary["inactive_members"])
+                with col4:
+                    st.metric("Today's Check-ins", summary["today_check_ins"])
+
+                # Latest check-ins; the Attendance page has the full list
+                recent_check_ins = summary["recent_check_ins"]
+                st.subheader("Recent Check-ins")
+                if recent_check_ins:
+                    df = pd.DataFrame(recent_check_ins)
                     df['check_in_time'] = pd.to_datetime(df['check_in_time']).dt.strftime('%I:%M %p')
                     df['member_id'] = df.apply(lambda x: x['member']['member_code'] if x['member'] else x['member_id'], axis=1)
                     df = df[['id', 'member_id', 'check_in_time', 'check_out_time']]
@@ -304,12 +375,8 @@ if st.session_state.admin_token:
     elif st.session_state.current_page == "📝 Attendance":
         st.subheader("Attendance Records")
         try:
-            response = requests.get(
-                f"{API_URL}/attendance/today",
-                headers={"Authorization": f"Bearer {st.session_state.admin_token}"}
-            )
-            if response.status_code == 200:
-                attendances = response.json()
+            attendances = fetch_today_attendance({"Authorization": f"Bearer {st.session_state.admin_token}"})
+            if attendances is not None:
                 if attendances:
                     df = pd.DataFrame(attendances)
                     df['member_id'] = df.apply(lambda x: x['member']['member_code'] if x['member'] else x['member_id'], axis=1)
@@ -393,7 +460,7 @@ if not st.session_state.admin_token:
                 phone = st.text_input("📱 Phone Number", key="attendance_phone")
                 submit_disabled = not (name and len(name) >= 3 and phone and len(phone) == 10 and phone.isdigit())
             else:
-                member_id = st.text_input("🆔 Member ID (e.g., TDFC001)", key="attendance_member_id")  # Updated example
+                member_id = st.text_input(f"🆔 Member ID (e.g., {MEMBER_CODE_PREFIX}001)", key="attendance_member_id")  # Updated example
                 member_id = member_id.strip().upper()
     
             submitted = st.form_submit_button("✅ Mark Attendance")
@@ -409,7 +476,7 @@ if not st.session_state.admin_token:
                         try:
                             success = mark_attendance_by_id(member_id)  # Pass the full ID directly
                         except Exception:
-                            st.error("❌ Invalid Member ID format. Please use format TDFC001")
+                            st.error(f"❌ Invalid Member ID format. Please use format {MEMBER_CODE_PREFIX}001")
                             success = False
                         if success:
                             st.session_state.form_submitted = True
@@ -0,0 +1,127 @@
+"""Kiosk-side copy of the backend's member snapshot (GET /members/snapshot).
+
+Member codes are checked against this local copy, so an unknown or inactive
+code is rejected instantly and a valid one needs only the final
+POST /attendance/mark, even while the API is slow. The snapshot is refreshed
+with deltas and saved to disk in the backend's own format, so a restarted
+kiosk starts from its last copy. See backend/app/member_snapshot.py for the
+format.
+"""
+import hashlib
+import os
+import struct
+import threading
+import time
+
+import requests
+
+MAGIC = b"GMS1"
+HEADER = struct.Struct("<4sHHQQI16s4x")
+RECORD = struct.Struct("<16s16sBxHI")
+FLAG_DELTA = 1
+STATUS_ACTIVE = 1
+STATUS_REMOVED = 2
+
+
+def decode(data: bytes):
+    magic, flags, _, version, since, count, salt = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a member snapshot")
+    names_start = HEADER.size + count * RECORD.size
+    members = []
+    for i in range(count):
+        code, phone_hash, status, name_len, name_offset = RECORD.unpack_from(data, HEADER.size + i * RECORD.size)
+        start = names_start + name_offset
+        members.append({
+            "member_code": code.rstrip(b"\0").decode(),
+            "phone_hash": phone_hash,
+            "status": status,
+            "name": data[start:start + name_len].decode(),
+        })
+    return {"delta": bool(flags & FLAG_DELTA), "version": version, "since": since, "salt": salt, "members": members}
+
+
+def encode(version: int, salt: bytes, members) -> bytes:
+    records = []
+    names = bytearray()
+    for member in sorted(members, key=lambda m: m["member_code"]):
+        name = member["name"].encode()
+        records.append(RECORD.pack(
+            member["member_code"].encode(), member["phone_hash"], member["status"], len(name), len(names)
+        ))
+        names += name
+    return HEADER.pack(MAGIC, 0, 0, version, 0, len(records), salt) + b"".join(records) + bytes(names)
+
+
+class MemberSnapshot:
+    def __init__(self, path: str, refresh_seconds: float = 30, timeout: float = 2):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.timeout = timeout
+        self.version = 0
+        self.salt = b""
+        self.members = {}
+        self.refreshed_at = 0.0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    self._apply(decode(f.read()))
+            except (OSError, ValueError, struct.error):
+                self.version, self.members = 0, {}
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.salt)
+
+    def _apply(self, snapshot):
+        if not snapshot["delta"]:
+            self.members = {}
+        for member in snapshot["members"]:
+            if member["status"] == STATUS_REMOVED:
+                self.members.pop(member["member_code"], None)
+            else:
+                self.members[member["member_code"]] = member
+        self.version = snapshot["version"]
+        self.salt = snapshot["salt"]
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encode(self.version, self.salt, self.members.values()))
+        os.replace(tmp_path, self.path)
+
+    def refresh(self, api_url: str, params=None, force: bool = False) -> bool:
+        """Fetch changes since our version; False (keeping the local copy) if the API is unreachable."""
+        with self._lock:
+            if not force and time.monotonic() - self.refreshed_at < self.refresh_seconds:
+                return True
+            query = dict(params or {})
+            if self.loaded:
+                query["since"] = self.version
+            try:
+                response = requests.get(f"{api_url}/members/snapshot", params=query, timeout=self.timeout)
+                response.raise_for_status()
+                snapshot = decode(response.content)
+            except (requests.RequestException, ValueError, struct.error):
+                return False
+            self._apply(snapshot)
+            self.refreshed_at = time.monotonic()
+            try:
+                self._save()
+            except OSError:
+                pass
+            return True
+
+    def phone_hash(self, phone: str) -> bytes:
+        return hashlib.sha256(self.salt + phone.encode()).digest()[:16]
+
+    def lookup(self, member_code: str):
+        return self.members.get(member_code)
+
+    def find(self, name: str, phone: str):
+        phone_hash = self.phone_hash(phone)
+        for member in self.members.values():
+            if member["name"] == name and member["phone_hash"] == phone_hash:
+                return member
+        return None